@@ -1,14 +1,32 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file, url_for
 from flask_bcrypt import Bcrypt
 import MySQLdb
 import os
 from dotenv import load_dotenv
-from deepface import DeepFace
-from email.message import EmailMessage
-import smtplib
-import ssl
+import model_manager
+import inference_workers
+import image_io
+import metrics
+from db_pool import ConnectionPool
+import migrate
+import pagination
+import cache
+import bulk_ingest
+import sequence
+import rppg
+import scoring
+import emotion_store
+import avatar_store
+import scan_sessions
+import serialization
+import mail_dispatcher
+import otp_store
+import logs
+import request_metrics
+import json
+import numpy as np
+import multiprocessing
 
-from decimal import Decimal
 from datetime import datetime, date
 from flask_cors import CORS
 # --------------------
@@ -18,17 +36,53 @@ load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
+# DB values (datetime, Decimal, bytes) are encoded by the JSON provider
+app.json = serialization.JSONResponses(app)
+# Per-endpoint latency/status metrics and slow-request logging
+request_metrics.install(app)
+
+log = logs.get_logger("app")
 
 CORS(app, resources={r"/api/*": {"origins": ["http://127.0.0.1:5001", "http://localhost:5001"]}})
 
 bcrypt = Bcrypt(app)
+# Only used when SPILL_UPLOADS_TO_DISK is enabled for debugging
 UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# Run inference in a separate worker-process pool when INFERENCE_WORKERS > 0,
+# otherwise in-process. Both expose the same interface.
+inference = inference_workers if inference_workers.INFERENCE_WORKERS > 0 else model_manager
+
+# Per-doctor dashboard counters; save_assessment invalidates on write
+dashboard_cache = cache.make_cache(
+    "dashboard_stats",
+    maxsize=int(os.getenv("DASHBOARD_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+)
+
+# /api/analyze results keyed by a perceptual hash of the decoded image, so a
+# re-uploaded photo or an unchanged "Try again" frame skips the model
+analysis_cache = cache.make_cache(
+    "analysis_results",
+    maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "600"))
+)
+
+# Pending login codes (see otp_store.py); kept out of the doctors table
+otps = otp_store.make_store()
+
+# How long /api/analyze waits for the emotion model while it is still warming up
+MODEL_WAIT_TIMEOUT = float(os.getenv("MODEL_WAIT_TIMEOUT", "30"))
+
+# INFERENCE_ENABLED=false runs a CRUD-only instance: the ML stack is never
+# imported and the analysis endpoints answer 503, so patients/doctor APIs
+# can boot instantly and scale separately from inference
+INFERENCE_ENABLED = os.getenv("INFERENCE_ENABLED", "true").lower() in ("1", "true", "yes")
 
 # --------------------
 # Database Connection
 # --------------------
-def get_db_connection():
+def _connect():
     return MySQLdb.connect(
         host=os.getenv("DB_HOST"),
         user=os.getenv("DB_USER"),
@@ -37,44 +91,41 @@ def get_db_connection():
         charset="utf8"
     )
 
+# One connection per waitress thread by default
+db_pool = ConnectionPool(
+    _connect,
+    size=int(os.getenv("DB_POOL_SIZE", os.getenv("WAITRESS_THREADS", "6"))),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    ping_after=float(os.getenv("DB_POOL_PING_AFTER", "30")),
+    idle_timeout=float(os.getenv("DB_POOL_IDLE_TIMEOUT", "600"))
+)
+
+def get_db_connection():
+    # Pooled: db.close() hands the connection back instead of disconnecting
+    return db_pool.acquire()
+
 # --------------------
 # Database Initialization
 # --------------------
 def init_db():
+    db = None
     try:
         db = get_db_connection()
-        cursor = db.cursor()
-        
-        # Helper to run sql file
-        def run_sql_file(filename):
-            if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    sql_commands = f.read().split(';')
-                    for command in sql_commands:
-                        if command.strip():
-                            cursor.execute(command)
-                db.commit()
-                print(f"Executed {filename}")
-            else:
-                print(f"File not found: {filename}")
-
-        # Run creation scripts
-        run_sql_file("create_doctors_table.sql") # Ensure doctors table exists
-        # patients table is likely created manually or via another script previously, 
-        # but let's assume it exists or I should have created a script for it. 
-        # For now, I'll just run assessments.
-        run_sql_file("create_assessments_table.sql")
-        
-        cursor.close()
-        db.close()
+        # Apply any pending versioned migrations (see migrate.py)
+        migrate.run_migrations(db)
     except Exception as e:
-        print(f"Database Initialization Error: {e}")
+        log.error("Database initialization failed", extra={"error": str(e)})
+    finally:
+        if db:
+            db.close()
 
-# Initialize DB on startup
-if os.environ.get("WERKZEUG_RUN_MAIN") == "true": # Only run once in debug mode
-    init_db()
-elif not app.debug:
-    init_db()
+# Initialize DB and start loading the emotion model on startup
+# (but not inside inference worker processes, which re-import this module)
+if multiprocessing.parent_process() is None:
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" or not app.debug: # Only run once in debug mode
+        init_db()
+        if INFERENCE_ENABLED:
+            inference.start()
 
 
 # --------------------
@@ -85,93 +136,351 @@ def home():
     return {"message": "AnxiSense Backend Running"}
 
 
-# ----------------------------
-# Anxiety score calculation
-# ----------------------------
-def calculate_anxiety(emotions):
-    fear = float(emotions.get("fear", 0))
-    sad = float(emotions.get("sad", 0))
-    surprise = float(emotions.get("surprise", 0))
-
-    anxiety_score = (
-            0.5 * fear +
-            0.3 * sad +
-            0.2 * surprise
-    )
+# --------------------
+# HEALTH CHECK (load balancers)
+# --------------------
+@app.route("/api/health", methods=["GET"])
+def health():
+    if not INFERENCE_ENABLED:
+        return jsonify({"status": "ok", "inference": "disabled"}), 200
+    state = inference.status()
+    if state == inference.STATE_READY:
+        return jsonify({"status": "ok"}), 200
+    if state == inference.STATE_FAILED:
+        return jsonify({"status": "failed", "error": inference.last_error()}), 503
+    return jsonify({"status": "loading"}), 503
 
-    if anxiety_score < 30:
-        level = "Low"
-    elif anxiety_score < 60:
-        level = "Moderate"
-    else:
-        level = "High"
 
-    return round(anxiety_score, 2), level
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    return jsonify(metrics.snapshot()), 200
+
+
+# Prometheus scrape target
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+# Raised when the model (or the worker pool) can't serve right now
+MODEL_NOT_READY = (model_manager.ModelNotReady, inference_workers.ModelNotReady)
+
+
+def model_unavailable():
+    # None when the emotion model can serve, otherwise a 503 response
+    if not INFERENCE_ENABLED:
+        return jsonify({"success": False, "error": "Analysis is disabled on this instance"}), 503
+    if not inference.wait_until_ready(MODEL_WAIT_TIMEOUT):
+        return jsonify({
+            "success": False,
+            "error": f"Emotion model is {inference.status()}, try again shortly"
+        }), 503
+    return None
+
+
+# ----------------------------
+# Heart-rate (rPPG) contribution
+# ----------------------------
+# Elevated pulse raises the emotion-based score by up to HEART_RATE_WEIGHT
+# of the way towards a 0-100 arousal score (70 bpm -> 0, 120 bpm -> 100).
+# Estimates without a clear pulse (bpm None, see rppg.MIN_SNR_DB) are ignored.
+HEART_RATE_WEIGHT = float(os.getenv("HEART_RATE_WEIGHT", "0.2"))
+
+
+def combine_with_heart_rate(anxiety_score, heart_rate):
+    if not heart_rate or heart_rate["bpm"] is None:
+        return anxiety_score
+    arousal = min(100.0, max(0.0, (heart_rate["bpm"] - 70.0) * 2.0))
+    return round((1 - HEART_RATE_WEIGHT) * anxiety_score + HEART_RATE_WEIGHT * arousal, 2)
+
+
+def read_heart_rate(payload):
+    # payload: {"signal": [...], "fps": 10, "timestamps": [...] (optional, ms)}
+    if not payload:
+        return None
+    if not isinstance(payload, dict):
+        raise rppg.InvalidSignal("rPPG payload must be an object")
+    timestamps = payload.get("timestamps")
+    if timestamps is not None:
+        timestamps = [t / 1000.0 for t in timestamps]
+    return rppg.estimate(payload["signal"], payload.get("fps", 10), timestamps=timestamps)
+
+
+def heart_rate_from_form():
+    # Optional "rppg" form field on the analyze endpoints; a bad or too
+    # short signal just means no heart-rate contribution
+    raw = request.form.get("rppg")
+    if not raw:
+        return None
+    try:
+        return read_heart_rate(json.loads(raw))
+    except (ValueError, KeyError, TypeError) as e:
+        log.info("Ignoring rPPG signal", extra={"error": str(e)})
+        return None
+
+
+def frame_result(timestamp, result):
+    emotions = {k: float(v) for k, v in result["emotion"].items()}
+    score, _ = scoring.score(emotions)
+    return {
+        "timestamp": round(timestamp, 3),
+        "dominant_emotion": result["dominant_emotion"],
+        "emotion_probabilities": emotions,
+        "anxiety_score": score
+    }
+
+
+def summarize_frames(per_frame, heart_rate=None):
+    # Smooth the per-frame scores over time; the median of the smoothed
+    # series keeps single noisy frames (blinks, motion blur) from
+    # dominating the result
+    smoothed = sequence.ema([f["anxiety_score"] for f in per_frame])
+    anxiety_score = round(float(np.median(smoothed)), 2)
+    anxiety_score = combine_with_heart_rate(anxiety_score, heart_rate)
+
+    vectors = [[f["emotion_probabilities"][k] for k in model_manager.EMOTION_LABELS] for f in per_frame]
+    mean_vector = np.mean(vectors, axis=0)
+    emotions = {k: round(float(v), 4) for k, v in zip(model_manager.EMOTION_LABELS, mean_vector)}
+
+    return {
+        "dominant_emotion": model_manager.EMOTION_LABELS[int(np.argmax(mean_vector))],
+        "emotion_probabilities": emotions,
+        "anxiety_score": anxiety_score,
+        "anxiety_level": scoring.level(anxiety_score),
+        "heart_rate": heart_rate,
+        "frame_count": len(per_frame),
+        "frames": per_frame,
+        "smoothed_scores": [round(float(v), 2) for v in smoothed]
+    }
+
+
+def analysis_cache_key(img):
+    # Model settings are part of the key so a shared (Redis) cache never
+    # mixes results from differently configured instances
+    h, w = img.shape[:2]
+    return f"{model_manager.DETECTOR_BACKEND}:{model_manager.EMOTION_RUNTIME}:{w}x{h}:{image_io.perceptual_hash(img)}"
+
+
+def analyze_cached(img):
+    if isinstance(img, str):
+        # Spill-to-disk debug mode: always run the model
+        return inference.analyze(img)
+
+    key = analysis_cache_key(img)
+    result = analysis_cache.get(key)
+    if result is None:
+        result = inference.analyze(img)
+        result = {
+            "emotion": {k: float(v) for k, v in result["emotion"].items()},
+            "dominant_emotion": result["dominant_emotion"]
+        }
+        analysis_cache.set(key, result)
+    return result
 
 
 @app.route("/api/analyze", methods=["POST"])
 def analyze_face():
-    print("✅ /api/analyze HIT", flush=True)
-
     if "image" not in request.files:
         return jsonify({"error": "No image uploaded"}), 400
 
     image_file = request.files["image"]
 
-    filename = f"{datetime.now().timestamp()}.jpg"
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    image_file.save(filepath)
+    unavailable = model_unavailable()
+    if unavailable:
+        return unavailable
+
+    filepath = None
+    try:
+        with metrics.phase("upload"):
+            if image_io.SPILL_UPLOADS_TO_DISK:
+                filepath = image_io.spill_to_disk(image_file, UPLOAD_FOLDER)
+                img = filepath
+            else:
+                img = image_io.read_upload(image_file)
+    except image_io.InvalidImage as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
     try:
         # User requested enforce_detection=False in deepface_model.py
-        result = DeepFace.analyze(
-            img_path=filepath,
-            actions=["emotion"],
-            enforce_detection=False
-        )
+        # (the resident model keeps it)
+        result = analyze_cached(img)
 
-        emotions_raw = result[0]["emotion"]
+        emotions_raw = result["emotion"]
 
         # Convert numpy floats → python floats
         emotions = {k: float(v) for k, v in emotions_raw.items()}
 
-        dominant_emotion = result[0]["dominant_emotion"]
+        dominant_emotion = result["dominant_emotion"]
 
-        anxiety_score, anxiety_level = calculate_anxiety(emotions)
+        heart_rate = heart_rate_from_form()
+        with metrics.phase("scoring"):
+            anxiety_score, anxiety_level = scoring.score(emotions)
+            if heart_rate:
+                anxiety_score = combine_with_heart_rate(anxiety_score, heart_rate)
+                anxiety_level = scoring.level(anxiety_score)
 
-        # 🔥 PRINT FINAL OUTPUT IN TERMINAL
-        print("\n------ ANALYSIS RESULT ------", flush=True)
-        print("Dominant Emotion:", dominant_emotion, flush=True)
-        print("Emotion Probabilities:", emotions, flush=True)
-        print("Anxiety Score:", anxiety_score, flush=True)
-        print("Anxiety Level:", anxiety_level, flush=True)
-        print("-----------------------------\n", flush=True)
+        log.info("analysis", extra={
+            "dominant_emotion": dominant_emotion,
+            "emotion_probabilities": emotions,
+            "anxiety_score": anxiety_score,
+            "anxiety_level": anxiety_level
+        })
 
         response = {
             "success": True,
             "dominant_emotion": dominant_emotion,
             "emotion_probabilities": emotions,
             "anxiety_score": anxiety_score,
-            "anxiety_level": anxiety_level
+            "anxiety_level": anxiety_level,
+            "heart_rate": heart_rate
         }
 
         return jsonify(response), 200
 
+    except MODEL_NOT_READY as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+
     except Exception as e:
-        print("Error:", str(e))
+        log.exception("Analysis failed")
         return jsonify({"success": False, "error": str(e)}), 500
 
     finally:
-        if os.path.exists(filepath):
+        if filepath and os.path.exists(filepath):
             os.remove(filepath)
 
+@app.route("/api/analyze/sequence", methods=["POST"])
+def analyze_sequence():
+    # Whole scan window in one request: "frames" parts (+ "fps") or a "video"
+    # clip. Sampled frames go through one batched emotion pass.
+    unavailable = model_unavailable()
+    if unavailable:
+        return unavailable
+
+    try:
+        with metrics.phase("upload"):
+            frames = sequence.read_sequence(request)
+    except (sequence.InvalidSequence, image_io.InvalidImage) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        results = inference.analyze_batch([img for _, img in frames])
+        heart_rate = heart_rate_from_form()
+        with metrics.phase("scoring"):
+            per_frame = [frame_result(timestamp, result) for (timestamp, _), result in zip(frames, results)]
+            response = summarize_frames(per_frame, heart_rate)
+        return jsonify({"success": True, **response}), 200
+
+    except MODEL_NOT_READY as e:
+        return jsonify({"success": False, "error": str(e)}), 503
+
+    except Exception as e:
+        log.exception("Analysis failed")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ----------------------------
+# Streaming scan sessions
+# ----------------------------
+# POST /api/scan-sessions                  -> {"session_id"}
+# POST /api/scan-sessions/<id>/frames      one or more "frame" parts (+ "t",
+#                                          seconds since scan start) -> rolling result
+# POST /api/scan-sessions/<id>/finish      (+ optional "rppg") -> final result
+@app.route("/api/scan-sessions", methods=["POST"])
+def open_scan_session():
+    unavailable = model_unavailable()
+    if unavailable:
+        return unavailable
+
+    session = scan_sessions.create()
+    return jsonify({
+        "success": True,
+        "session_id": session.id,
+        "expires_in": scan_sessions.SCAN_SESSION_TTL,
+        "max_frames": scan_sessions.SCAN_SESSION_MAX_FRAMES
+    }), 201
+
+@app.route("/api/scan-sessions/<session_id>/frames", methods=["POST"])
+def push_scan_frames(session_id):
+    try:
+        session = scan_sessions.get(session_id)
+    except scan_sessions.SessionNotFound:
+        return jsonify({"success": False, "error": "Scan session not found or expired"}), 404
+
+    files = request.files.getlist("frame")
+    if not files:
+        return jsonify({"success": False, "error": "No frame uploaded"}), 400
+
+    try:
+        t = float(request.form.get("t", session.elapsed()))
+        with metrics.phase("upload"):
+            imgs = [image_io.read_upload(f) for f in files]
+    except ValueError as e:
+        # InvalidImage is a ValueError too
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        slot = session.reserve(len(imgs))
+    except scan_sessions.SessionFull as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+
+    try:
+        if len(imgs) == 1:
+            results = [inference.analyze(imgs[0])]
+        else:
+            frames = sequence.uniform_size([(t, img) for img in imgs])
+            results = inference.analyze_batch([img for _, img in frames])
+        session.fill(slot, [frame_result(t, result) for result in results])
+    except MODEL_NOT_READY as e:
+        session.release(slot, len(imgs))
+        return jsonify({"success": False, "error": str(e)}), 503
+    except Exception as e:
+        session.release(slot, len(imgs))
+        log.exception("Analysis failed")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    partial = summarize_frames(session.frames())
+    return jsonify({
+        "success": True,
+        "frame_count": partial["frame_count"],
+        "anxiety_score": partial["anxiety_score"],
+        "anxiety_level": partial["anxiety_level"],
+        "dominant_emotion": partial["dominant_emotion"]
+    }), 200
+
+@app.route("/api/scan-sessions/<session_id>/finish", methods=["POST"])
+def finish_scan_session(session_id):
+    try:
+        session = scan_sessions.close(session_id)
+    except scan_sessions.SessionNotFound:
+        return jsonify({"success": False, "error": "Scan session not found or expired"}), 404
+
+    per_frame = session.frames()
+    if not per_frame:
+        return jsonify({"success": False, "error": "No frames were analysed in this session"}), 400
+
+    response = summarize_frames(per_frame, heart_rate_from_form())
+    return jsonify({"success": True, **response}), 200
+
+@app.route("/api/heart-rate", methods=["POST"])
+def estimate_heart_rate():
+    # {"signal": [...], "fps": 10, "timestamps": [...]} -> BPM / HRV / SNR.
+    # "signals" (equal-length series) estimates several scans in one call.
+    data = request.get_json(silent=True) or {}
+    try:
+        if "signals" in data:
+            result = rppg.estimate(data["signals"], data.get("fps", 10))
+        else:
+            result = read_heart_rate(data)
+    except (rppg.InvalidSignal, ValueError, KeyError, TypeError) as e:
+        return jsonify({"success": False, "message": f"Invalid signal: {e}"}), 400
+
+    return jsonify({"success": True, "data": result}), 200
+
 # ----------------------------
 # Email Helper Function
 # ----------------------------
 
 @app.route("/api/patients", methods=["POST"])
 def create_patient():
-    print("patient start")
     db = None
     cursor = None
     try:
@@ -263,48 +572,45 @@ def get_patients():
         except ValueError:
             return jsonify({"success": False, "message": "Invalid doctorid format"}), 400
 
-        print(f"DEBUG: Fetching patients for Doctor ID: {doctorid_int}", flush=True)
+        # Optional keyset pagination: ?limit=N&cursor=<next_cursor>.
+        # Without limit every patient is returned (streamed).
+        try:
+            limit = pagination.parse_limit(request.args.get("limit"))
+            after_id = None
+            if request.args.get("cursor"):
+                (after_id,) = pagination.decode_cursor(request.args["cursor"], int)
+        except pagination.InvalidPageRequest as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
+        log.debug("Fetching patients", extra={"doctor_id": doctorid_int})
 
         db = get_db_connection()
-        cursor = db.cursor(MySQLdb.cursors.DictCursor)
+        cursor = db.cursor(MySQLdb.cursors.SSCursor)
 
-        # Fetch patients with their LATEST assessment score
+        # Latest assessment columns are kept on the patients row by
+        # save_assessment, so this is a single lookup by doctorid
         query = """
-            SELECT p.*, 
-                   a.anxiety_score as latest_anxiety_score, 
-                   a.anxiety_level as latest_anxiety_level,
-                   a.dominant_emotion as latest_dominant_emotion,
-                   a.created_at as last_assessment_date
+            SELECT p.*
             FROM patients p
-            LEFT JOIN (
-                SELECT patient_id, anxiety_score, anxiety_level, dominant_emotion, created_at
-                FROM assessments a1
-                WHERE id = (
-                    SELECT MAX(id) FROM assessments a2 WHERE a2.patient_id = a1.patient_id
-                )
-            ) a ON p.id = a.patient_id
             WHERE p.doctorid = %s
-            ORDER BY p.id DESC
         """
-        
-        cursor.execute(query, (doctorid_int,))
-        patients = cursor.fetchall()
-        
-        print(f"DEBUG: Found {len(patients)} patients for Doctor ID: {doctorid_int}", flush=True)
-        
-        # Handle datetime serialization
-        for p in patients:
-            for k, v in p.items():
-                if isinstance(v, (datetime, date)):
-                    p[k] = v.strftime("%Y-%m-%d %H:%M:%S")
-                # Handle Decimal serialization if using Decimal type for scores
-                if isinstance(v, Decimal):
-                    p[k] = float(v)
+        params = [doctorid_int]
 
-        return jsonify({
-            "success": True,
-            "data": patients
-        }), 200
+        if after_id is not None:
+            query += " AND p.id < %s"
+            params.append(after_id)
+
+        query += " ORDER BY p.id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
+        cursor.execute(query, tuple(params))
+
+        # The stream now owns the connection and releases it when done
+        response = pagination.stream_rows(db, cursor, limit, lambda row: pagination.encode_cursor(row["id"]))
+        db = cursor = None
+        return response
 
     except Exception as e:
         return jsonify({"success": False, "message": "Server error", "error": str(e)}), 500
@@ -316,6 +622,23 @@ def get_patients():
             db.close()
 
 
+def refresh_latest_assessment(cursor, assessment_id):
+    # Copy a new assessment onto its patient's latest_* columns. The id check
+    # keeps an older row from overwriting a newer one. Run it in the same
+    # transaction as the INSERT.
+    cursor.execute("""
+        UPDATE patients p
+        JOIN assessments a ON a.id = %s
+        SET p.latest_assessment_id = a.id,
+            p.latest_anxiety_score = a.anxiety_score,
+            p.latest_anxiety_level = a.anxiety_level,
+            p.latest_dominant_emotion = a.dominant_emotion,
+            p.last_assessment_date = a.created_at
+        WHERE p.id = a.patient_id
+          AND (p.latest_assessment_id IS NULL OR p.latest_assessment_id < a.id)
+    """, (assessment_id,))
+
+
 @app.route("/api/assessments", methods=["POST"])
 def save_assessment():
     db = None
@@ -332,21 +655,30 @@ def save_assessment():
         if patient_id is None or doctor_id is None or anxiety_score is None or anxiety_level is None:
              return jsonify({"success": False, "message": "Missing required fields"}), 400
 
+        # Optional: the full 7-class vector from /api/analyze, stored packed
+        try:
+            emotion_vector = emotion_store.pack(data.get("emotion_probabilities"))
+        except emotion_store.InvalidVector as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
         db = get_db_connection()
         cursor = db.cursor()
 
         cursor.execute("""
             INSERT INTO assessments 
-            (patient_id, doctor_id, anxiety_score, anxiety_level, dominant_emotion)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (patient_id, doctor_id, anxiety_score, anxiety_level, dominant_emotion))
-        
+            (patient_id, doctor_id, anxiety_score, anxiety_level, dominant_emotion, emotion_vector)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (patient_id, doctor_id, anxiety_score, anxiety_level, dominant_emotion, emotion_vector))
+        assessment_id = cursor.lastrowid
+
+        refresh_latest_assessment(cursor, assessment_id)
         db.commit()
+        invalidate_dashboard_stats(doctor_id)
         
         return jsonify({
             "success": True, 
             "message": "Assessment saved successfully",
-            "id": cursor.lastrowid
+            "id": assessment_id
         }), 201
 
     except Exception as e:
@@ -360,6 +692,46 @@ def save_assessment():
 
 
 
+# ----------------------------
+# Bulk Assessment Ingestion (offline sync / imports)
+# ----------------------------
+@app.route("/api/assessments/bulk", methods=["POST"])
+def bulk_save_assessments():
+    # Body: JSON array of assessments, or NDJSON (Content-Type: application/x-ndjson).
+    # Optional Idempotency-Key header makes retries of the same payload safe.
+    summary = bulk_ingest.new_summary()
+    try:
+        records = bulk_ingest.iter_records(request.stream, request.mimetype)
+        # A connection is taken per chunk, once its rows have been read
+        bulk_ingest.ingest(get_db_connection, records, summary, request.headers.get("Idempotency-Key"))
+
+        return jsonify({
+            "success": not summary["errors"],
+            "received": summary["received"],
+            "inserted": summary["inserted"],
+            "duplicates": summary["duplicates"],
+            "errors": summary["errors"]
+        }), 200
+
+    except bulk_ingest.InvalidBulkPayload as e:
+        # Chunks before the bad row are already committed; report how far we got
+        return jsonify({
+            "success": False,
+            "message": str(e),
+            "received": summary["received"],
+            "inserted": summary["inserted"],
+            "duplicates": summary["duplicates"],
+            "errors": summary["errors"]
+        }), 400
+
+    except Exception as e:
+        return jsonify({"success": False, "message": "Server error", "error": str(e), "inserted": summary["inserted"]}), 500
+
+    finally:
+        for doctor_id in summary["doctor_ids"]:
+            invalidate_dashboard_stats(doctor_id)
+
+
 # ----------------------------
 # Retrieve Assessments (History)
 # ----------------------------
@@ -381,8 +753,17 @@ def get_assessments():
             except ValueError:
                 return jsonify({"success": False, "message": "Invalid doctorid format"}), 400
 
+        # Keyset pagination on (created_at, id): ?limit=N&cursor=<next_cursor>
+        try:
+            limit = pagination.parse_limit(request.args.get("limit"), default=50)
+            after = None
+            if request.args.get("cursor"):
+                after = pagination.decode_cursor(request.args["cursor"], datetime, int)
+        except pagination.InvalidPageRequest as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
         db = get_db_connection()
-        cursor = db.cursor(MySQLdb.cursors.DictCursor)
+        cursor = db.cursor(MySQLdb.cursors.SSCursor)
         
         # Base query joining patients to get names
         query = """
@@ -402,27 +783,30 @@ def get_assessments():
                 pass # or handle error
 
         elif doctor_id:
-            print(f"DEBUG: Fetching assessments for Doctor ID: {doctor_id}", flush=True)
+            log.debug("Fetching assessments", extra={"doctor_id": doctor_id})
             # If fetching for doctor, we filter by doctor_id on assessments table
             query += " WHERE a.doctor_id = %s"
             params.append(doctor_id)
-            
-        query += " ORDER BY a.created_at DESC LIMIT 50"
+
+        if after is not None:
+            created_at, last_id = after
+            query += " AND " if params else " WHERE "
+            query += "(a.created_at < %s OR (a.created_at = %s AND a.id < %s))"
+            params.extend([created_at, created_at, last_id])
+
+        query += " ORDER BY a.created_at DESC, a.id DESC LIMIT %s"
+        params.append(limit + 1)
         
         cursor.execute(query, tuple(params))
-        assessments = cursor.fetchall()
-        
-        print(f"DEBUG: Found {len(assessments)} assessments", flush=True)
 
-        # Convert datetime objects to string
-        for a in assessments:
-            if 'created_at' in a and a['created_at']:
-                a['created_at'] = a['created_at'].strftime("%Y-%m-%d %H:%M:%S")
-
-        return jsonify({
-            "success": True,
-            "data": assessments
-        }), 200
+        # The stream now owns the connection and releases it when done
+        response = pagination.stream_rows(
+            db, cursor, limit,
+            lambda row: pagination.encode_cursor(row["created_at"], row["id"]),
+            transform=emotion_store.row_for_json
+        )
+        db = cursor = None
+        return response
 
     except Exception as e:
         return jsonify({"success": False, "message": "Server error", "error": str(e)}), 500
@@ -476,44 +860,6 @@ def register_doctor():
             db.close()
 
 
-def send_email(receiver_email, subject, body):
-    sender_email = os.getenv("EMAIL_USER")
-    password = os.getenv("EMAIL_PASS")
-    host = os.getenv("EMAIL_HOST", "smtp.gmail.com")
-    port = int(os.getenv("EMAIL_PORT", "587"))
-    use_ssl = os.getenv("EMAIL_USE_SSL", "false").lower() in ("1", "true", "yes")
-    timeout = float(os.getenv("EMAIL_TIMEOUT", "30"))
-
-    if not sender_email or not password:
-        print("Error: EMAIL_USER or EMAIL_PASS not set in .env")
-        return False
-
-    msg = EmailMessage()
-    msg.set_content(body)
-    msg["Subject"] = subject
-    msg["From"] = sender_email
-    msg["To"] = receiver_email
-
-    context = ssl.create_default_context()
-
-    try:
-        if use_ssl:
-            with smtplib.SMTP_SSL(host, port, context=context, timeout=timeout) as server:
-                server.login(sender_email, password)
-                server.send_message(msg)
-        else:
-            with smtplib.SMTP(host, port, timeout=timeout) as server:
-                # Use STARTTLS for typical submission ports
-                if port == 587:
-                    server.starttls(context=context)
-                server.login(sender_email, password)
-                server.send_message(msg)
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
-
-
 @app.route("/api/doctor/send-otp", methods=["POST"])
 def send_otp():
     db = None
@@ -529,7 +875,7 @@ def send_otp():
         cursor = db.cursor(MySQLdb.cursors.DictCursor)
 
         # First, check if doctor exists in database
-        cursor.execute("SELECT * FROM doctors WHERE email=%s", (email,))
+        cursor.execute("SELECT id FROM doctors WHERE email=%s", (email,))
         doctor = cursor.fetchone()
 
         if not doctor:
@@ -539,37 +885,29 @@ def send_otp():
             }), 404
 
         # Generate 6-digit OTP
-        import random
-        otp = str(random.randint(100000, 999999))
-
-        # --- DEBUG FALLBACK ---
-        print(f"\n[DEBUG] OTP GENERATED FOR {email}: {otp}\n", flush=True)
-        # ----------------------
+        otp = otps.issue(email)
 
-        # Update existing doctor record with new OTP
-        cursor.execute(
-            "UPDATE doctors SET otp=%s WHERE email=%s",
-            (otp, email)
-        )
-        
-        db.commit()
-
-        # Send OTP via Email
-        email_sent = send_email(
+        # Queue the OTP mail; the dispatcher thread delivers it after we return
+        email_queued = mail_dispatcher.send(
             email,
             "Your AnxiSense OTP Code",
-            f"Your OTP code for AnxiSense verification is: {otp}\n\nThis code will expire in 10 minutes."
+            f"Your OTP code for AnxiSense verification is: {otp}\n\nThis code will expire in {int(otp_store.OTP_TTL // 60)} minutes."
         )
 
-        if email_sent:
+        if email_queued:
             return jsonify({
                 "message": "OTP sent successfully to your email",
                 "success": True
             }), 200
         else:
+            # --- DEBUG FALLBACK ---
+            # The code only reaches the terminal when mail failed and LOG_LEVEL=DEBUG
+            log.debug("OTP generated", extra={"email": email, "otp": otp})
+            # ----------------------
+
             # Still return success: True so user can login using terminal OTP
             return jsonify({
-                "message": "OTP generated! (Email failed to send due to network restriction. If you are the developer, check the backend terminal for the code.)",
+                "message": "OTP generated! (Email could not be sent. If you are the developer, run the backend with LOG_LEVEL=DEBUG and check the terminal for the code.)",
                 "success": True
             }), 200
 
@@ -595,32 +933,34 @@ def verify_otp():
         if not email or not otp:
             return jsonify({"message": "Email and OTP are required"}), 400
 
+        # Check the code before touching the database; wrong guesses cost nothing
+        result = otps.verify(email, otp)
+        if result == otp_store.EXPIRED:
+            return jsonify({"message": "OTP expired or not requested. Please request a new one.", "success": False}), 401
+        if result == otp_store.LOCKED:
+            return jsonify({"message": "Too many wrong attempts. Please request a new OTP.", "success": False}), 429
+        if result != otp_store.VERIFIED:
+            return jsonify({"message": "Invalid OTP", "success": False}), 401
+
         db = get_db_connection()
         cursor = db.cursor(MySQLdb.cursors.DictCursor)
 
-        cursor.execute("SELECT * FROM doctors WHERE email=%s", (email,))
+        cursor.execute(f"SELECT id, username, email, {AVATAR_COLUMNS} FROM doctors WHERE email=%s", (email,))
         doctor = cursor.fetchone()
 
         if not doctor:
             return jsonify({"message": "Email not found", "success": False}), 404
 
-        if doctor["otp"] == otp:
-            # Optional: Clear OTP after successful verification
-            cursor.execute("UPDATE doctors SET otp=NULL WHERE email=%s", (email,))
-            db.commit()
-
-            return jsonify({
-                "message": "OTP verified successfully",
-                "success": True,
-                "doctor": {
-                    "id": doctor["id"],
-                    "username": doctor["username"],
-                    "email": doctor["email"],
-                    "profile_image": doctor.get("profile_image")
-                }
-            }), 200
-        else:
-            return jsonify({"message": "Invalid OTP", "success": False}), 401
+        return jsonify({
+            "message": "OTP verified successfully",
+            "success": True,
+            "doctor": {
+                "id": doctor["id"],
+                "username": doctor["username"],
+                "email": doctor["email"],
+                "profile_image": resolve_avatar(db, cursor, doctor)
+            }
+        }), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -648,11 +988,14 @@ def get_doctor_profile():
         db = get_db_connection()
         cursor = db.cursor(MySQLdb.cursors.DictCursor)
         
-        cursor.execute("SELECT id, username, email, fullname, phone, specialization, clinic_name, profile_image FROM doctors WHERE id=%s", (doctor_id,))
+        cursor.execute(f"SELECT id, username, email, fullname, phone, specialization, clinic_name, {AVATAR_COLUMNS} FROM doctors WHERE id=%s", (doctor_id,))
         doctor = cursor.fetchone()
         
         if not doctor:
             return jsonify({"success": False, "message": "Doctor not found"}), 404
+
+        doctor["profile_image"] = resolve_avatar(db, cursor, doctor)
+        del doctor["avatar_ref"], doctor["has_legacy_image"]
             
         return jsonify({
             "success": True,
@@ -702,11 +1045,20 @@ def update_doctor_profile():
             update_fields.append("clinic_name=%s")
             params.append(clinic_name)
         
-        # New profile image field
+        # Profile image: a data URL is turned into stored thumbnails and the
+        # row keeps only the reference; an empty value removes the photo
+        avatar_ref = None
         if "profile_image" in data:
             profile_image = data.get("profile_image")
-            update_fields.append("profile_image=%s")
-            params.append(profile_image)
+            if not profile_image:
+                update_fields.append("avatar_ref=NULL, profile_image=NULL")
+            elif not str(profile_image).startswith(("http://", "https://")):
+                try:
+                    avatar_ref = avatar_store.save_data_url(profile_image)
+                except image_io.InvalidImage as e:
+                    return jsonify({"success": False, "message": str(e)}), 400
+                update_fields.append("avatar_ref=%s, profile_image=NULL")
+                params.append(avatar_ref)
             
         if not update_fields:
             return jsonify({"success": False, "message": "No fields to update"}), 400
@@ -720,10 +1072,13 @@ def update_doctor_profile():
         cursor.execute(query, tuple(params))
         db.commit()
         
-        return jsonify({
+        response = {
             "success": True, 
             "message": "Profile updated successfully"
-        }), 200
+        }
+        if avatar_ref:
+            response["profile_image"] = avatar_url(doctor_id, avatar_ref)
+        return jsonify(response), 200
 
     except Exception as e:
         return jsonify({"success": False, "message": "Server error", "error": str(e)}), 500
@@ -736,6 +1091,102 @@ def update_doctor_profile():
 
 
 
+# ----------------------------
+# Doctor avatars
+# ----------------------------
+# Doctor payloads carry an avatar URL instead of the image itself. The URL
+# is versioned by the content reference, so it can be cached indefinitely.
+AVATAR_COLUMNS = "avatar_ref, profile_image IS NOT NULL AS has_legacy_image"
+AVATAR_MAX_AGE = 365 * 24 * 3600
+
+
+def avatar_url(doctor_id, ref):
+    if not ref:
+        return None
+    return url_for("get_doctor_avatar", doctor_id=doctor_id, v=ref, _external=True)
+
+
+def resolve_avatar_ref(db, cursor, doctor):
+    # doctor: DictCursor row with id and AVATAR_COLUMNS. Photos saved before
+    # avatar_ref existed are converted from their data URL on first read.
+    ref = doctor.get("avatar_ref")
+    if not ref and doctor.get("has_legacy_image"):
+        cursor.execute("SELECT profile_image FROM doctors WHERE id=%s", (doctor["id"],))
+        try:
+            ref = avatar_store.save_data_url(cursor.fetchone()["profile_image"])
+        except image_io.InvalidImage as e:
+            log.warning("Could not convert profile image", extra={"doctor_id": doctor["id"], "error": str(e)})
+            return None
+        cursor.execute("UPDATE doctors SET avatar_ref=%s, profile_image=NULL WHERE id=%s", (ref, doctor["id"]))
+        db.commit()
+    return ref
+
+
+def resolve_avatar(db, cursor, doctor):
+    return avatar_url(doctor["id"], resolve_avatar_ref(db, cursor, doctor))
+
+
+@app.route("/api/doctor/<int:doctor_id>/avatar", methods=["GET"])
+def get_doctor_avatar(doctor_id):
+    size = avatar_store.pick_size(request.args.get("size"))
+
+    # Versioned URLs (?v=<ref>) are served straight from disk
+    ref = request.args.get("v")
+    versioned = avatar_store.is_ref(ref) and os.path.exists(avatar_store.path_for(ref, size))
+
+    if not versioned:
+        db = None
+        cursor = None
+        try:
+            db = get_db_connection()
+            cursor = db.cursor(MySQLdb.cursors.DictCursor)
+            cursor.execute(f"SELECT id, {AVATAR_COLUMNS} FROM doctors WHERE id=%s", (doctor_id,))
+            doctor = cursor.fetchone()
+            if not doctor:
+                return jsonify({"success": False, "message": "Doctor not found"}), 404
+            ref = resolve_avatar_ref(db, cursor, doctor)
+        except Exception as e:
+            return jsonify({"success": False, "message": "Server error", "error": str(e)}), 500
+        finally:
+            if cursor:
+                cursor.close()
+            if db:
+                db.close()
+
+        if not ref or not os.path.exists(avatar_store.path_for(ref, size)):
+            return jsonify({"success": False, "message": "No profile image"}), 404
+
+    response = send_file(
+        avatar_store.path_for(ref, size),
+        mimetype="image/jpeg",
+        etag=f"{ref}-{size}",
+        conditional=True,
+        max_age=AVATAR_MAX_AGE if versioned else 0
+    )
+    response.cache_control.public = True
+    if versioned:
+        response.cache_control.immutable = True
+    else:
+        # Unversioned URL: the photo may change, so revalidate via the ETag
+        response.cache_control.no_cache = True
+    return response
+
+
+def dashboard_generation(doctor_id):
+    return dashboard_cache.generation(str(doctor_id).strip())
+
+
+def dashboard_cache_key(doctor_id, generation):
+    # Keyed by day so "today" rolls over at midnight, and by generation so
+    # counts read before an invalidation are never served after it
+    return f"{str(doctor_id).strip()}:{generation}:{date.today().isoformat()}"
+
+
+def invalidate_dashboard_stats(doctor_id):
+    generation = dashboard_cache.bump(str(doctor_id).strip())
+    dashboard_cache.delete(dashboard_cache_key(doctor_id, generation - 1))
+
+
 @app.route("/api/doctor/dashboard-stats", methods=["GET"])
 def get_dashboard_stats():
     db = None
@@ -745,18 +1196,29 @@ def get_dashboard_stats():
         if not doctor_id:
              return jsonify({"success": False, "message": "doctorid is required"}), 400
 
-        db = get_db_connection()
-        cursor = db.cursor()
-
-        # Get Total Assessments (Clipboard Icon - Total Reports)
-        cursor.execute("SELECT COUNT(*) FROM assessments WHERE doctor_id=%s", (doctor_id,))
-        row_total = cursor.fetchone()
-        total_count = row_total[0] if row_total else 0
-
-        # Get Today's Unique Patients (People Icon - Patients Seen Today)
-        cursor.execute("SELECT COUNT(DISTINCT patient_id) FROM assessments WHERE doctor_id=%s AND DATE(created_at) = CURDATE()", (doctor_id,))
-        row_today = cursor.fetchone()
-        today_count = row_today[0] if row_today else 0
+        generation = dashboard_generation(doctor_id)
+        counts = dashboard_cache.get(dashboard_cache_key(doctor_id, generation))
+        if counts is None:
+            db = get_db_connection()
+            cursor = db.cursor()
+
+            # Get Total Assessments (Clipboard Icon - Total Reports)
+            cursor.execute("SELECT COUNT(*) FROM assessments WHERE doctor_id=%s", (doctor_id,))
+            row_total = cursor.fetchone()
+            total_count = row_total[0] if row_total else 0
+
+            # Get Today's Unique Patients (People Icon - Patients Seen Today)
+            cursor.execute("""
+                SELECT COUNT(DISTINCT patient_id) FROM assessments
+                WHERE doctor_id=%s AND created_at >= CURDATE() AND created_at < CURDATE() + INTERVAL 1 DAY
+            """, (doctor_id,))
+            row_today = cursor.fetchone()
+            today_count = row_today[0] if row_today else 0
+
+            counts = {"total": total_count, "today": today_count}
+            # An assessment saved while we counted makes these counts stale
+            if dashboard_generation(doctor_id) == generation:
+                dashboard_cache.set(dashboard_cache_key(doctor_id, generation), counts)
 
         # Stable Accuracy for the day (e.g., based on date hash to not jump randomly)
         # This simulates a "System calibration" that changes daily but stays constant during the day
@@ -769,8 +1231,8 @@ def get_dashboard_stats():
         return jsonify({
             "success": True,
             "data": {
-                "total": total_count,
-                "today": today_count,
+                "total": counts["total"],
+                "today": counts["today"],
                 "accuracy": accuracy
             }
         }), 200
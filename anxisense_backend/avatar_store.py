@@ -0,0 +1,94 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import uuid
+
+import cv2
+
+import image_io
+
+# ----------------------------
+# Doctor avatar store
+# ----------------------------
+# Profile photos are decoded once on upload, center-cropped to a square and
+# written as JPEG thumbnails in a few fixed sizes. Files are named by a hash
+# of the source image, so the doctors row only keeps that short reference
+# (avatar_ref) and a changed photo always gets a new URL, which lets the
+# avatar endpoint hand out long-lived cache headers.
+#
+#   AVATAR_DIR  where thumbnails are written (default ./avatars)
+
+AVATAR_DIR = os.getenv("AVATAR_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "avatars"))
+SIZES = (64, 128, 256)
+DEFAULT_SIZE = 128
+JPEG_QUALITY = 85
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+
+DATA_URL = re.compile(r"^data:image/[a-zA-Z0-9.+-]+;base64,")
+REF_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def parse_data_url(value):
+    # "data:image/jpeg;base64,...." (what profile.html sends) -> bytes
+    if not isinstance(value, str) or not DATA_URL.match(value):
+        raise image_io.InvalidImage("profile_image must be a base64 image data URL")
+    try:
+        data = base64.b64decode(value[value.index(",") + 1:], validate=True)
+    except (binascii.Error, ValueError):
+        raise image_io.InvalidImage("profile_image is not valid base64")
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise image_io.InvalidImage("profile_image is too large")
+    return data
+
+
+def pick_size(requested):
+    # Smallest stored size that covers the request
+    try:
+        requested = int(requested)
+    except (TypeError, ValueError):
+        return DEFAULT_SIZE
+    for size in SIZES:
+        if size >= requested:
+            return size
+    return SIZES[-1]
+
+
+def is_ref(value):
+    return bool(value) and bool(REF_PATTERN.match(value))
+
+
+def path_for(ref, size):
+    return os.path.join(AVATAR_DIR, ref[:2], f"{ref}_{size}.jpg")
+
+
+def save(data):
+    # Image bytes -> ref; thumbnails are written once per distinct image
+    ref = hashlib.sha256(data).hexdigest()[:32]
+    if all(os.path.exists(path_for(ref, size)) for size in SIZES):
+        return ref
+
+    img = image_io.decode_image(data, max_pixels=SIZES[-1] * SIZES[-1] * 4)
+    h, w = img.shape[:2]
+    side = min(h, w)
+    top, left = (h - side) // 2, (w - side) // 2
+    square = img[top:top + side, left:left + side]
+
+    os.makedirs(os.path.dirname(path_for(ref, SIZES[0])), exist_ok=True)
+    for size in SIZES:
+        thumb = cv2.resize(square, (size, size), interpolation=cv2.INTER_AREA if side > size else cv2.INTER_CUBIC)
+        ok, encoded = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            raise image_io.InvalidImage("Could not encode avatar")
+        # Write-then-rename so a concurrent reader never sees half a file
+        path = path_for(ref, size)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(encoded.tobytes())
+        os.replace(tmp, path)
+    return ref
+
+
+def save_data_url(value):
+    return save(parse_data_url(value))
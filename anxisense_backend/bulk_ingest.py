@@ -0,0 +1,316 @@
+import codecs
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import MySQLdb
+
+import emotion_store
+
+# ----------------------------
+# Bulk assessment ingestion
+# ----------------------------
+# Backs POST /api/assessments/bulk. Rows are parsed from a JSON array or an
+# NDJSON body one at a time, validated as they arrive and written with one
+# multi-row INSERT (executemany) per chunk, each chunk in its own
+# transaction on a pooled connection held only while that chunk is written,
+# so a slow upload never pins a connection. Rows carry an idempotency key (their own "idempotency_key",
+# or one derived from the request's Idempotency-Key header and the row's
+# position), so a retried sync skips rows that already landed.
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "100000"))
+MAX_RECORD_BYTES = 64 * 1024
+READ_SIZE = 64 * 1024
+
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+INSERT_SQL = """
+    INSERT INTO assessments
+    (patient_id, doctor_id, anxiety_score, anxiety_level, dominant_emotion, idempotency_key, emotion_vector)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+INSERT_WITH_TIME_SQL = """
+    INSERT INTO assessments
+    (patient_id, doctor_id, anxiety_score, anxiety_level, dominant_emotion, idempotency_key, emotion_vector, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+class InvalidBulkPayload(ValueError):
+    pass
+
+
+# ----------------------------
+# Parsing
+# ----------------------------
+def iter_ndjson(stream):
+    # Yields (index, record_or_None, error_or_None); a bad or oversized line
+    # is a row error
+    index = 0
+    while True:
+        line = stream.readline(MAX_RECORD_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_RECORD_BYTES and not line.endswith(b"\n"):
+            # Skip the rest of the line without buffering it
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(READ_SIZE)
+            yield index, None, f"Row exceeds {MAX_RECORD_BYTES} bytes"
+            index += 1
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield index, json.loads(line), None
+        except ValueError as e:
+            yield index, None, f"Invalid JSON: {e}"
+        index += 1
+
+
+def iter_json_array(stream):
+    # Incremental parse of a top-level JSON array, one element at a time
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    eof = False
+    state = "start"
+    index = 0
+
+    while True:
+        buf = buf.lstrip()
+        if not buf:
+            if eof:
+                raise InvalidBulkPayload("Unexpected end of JSON array")
+            chunk = stream.read(READ_SIZE)
+            eof = not chunk
+            buf += text_decoder.decode(chunk, final=eof)
+            continue
+
+        if state == "start":
+            if buf[0] != "[":
+                raise InvalidBulkPayload("Body must be a JSON array or NDJSON")
+            buf = buf[1:]
+            state = "first"
+        elif state == "sep":
+            if buf[0] == ",":
+                buf = buf[1:]
+                state = "value"
+            elif buf[0] == "]":
+                return
+            else:
+                raise InvalidBulkPayload(f"Expected ',' or ']' after row {index - 1}")
+        else:
+            if state == "first" and buf[0] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buf)
+            except ValueError as e:
+                # Probably a row split across reads; fetch more and retry
+                if eof or len(buf) >= MAX_RECORD_BYTES:
+                    raise InvalidBulkPayload(f"Invalid JSON at row {index}: {e}")
+                chunk = stream.read(READ_SIZE)
+                eof = not chunk
+                buf += text_decoder.decode(chunk, final=eof)
+                continue
+            yield index, record, None
+            index += 1
+            buf = buf[end:]
+            state = "sep"
+
+
+def iter_records(stream, mimetype):
+    if mimetype in NDJSON_MIMETYPES:
+        return iter_ndjson(stream)
+    return iter_json_array(stream)
+
+
+# ----------------------------
+# Validation
+# ----------------------------
+def row_key(record, index, request_key):
+    key = record.get("idempotency_key")
+    if key is not None:
+        key = str(key)
+        if len(key) > 64:
+            raise ValueError("idempotency_key must be at most 64 characters")
+        return key
+    if request_key:
+        return hashlib.sha256(f"{request_key}:{index}".encode("utf-8")).hexdigest()
+    return None
+
+
+def validate(record, index, request_key):
+    # Returns a row tuple for INSERT (created_at and the packed emotion
+    # vector last, either may be None)
+    if not isinstance(record, dict):
+        raise ValueError("Row must be a JSON object")
+
+    try:
+        patient_id = int(record["patient_id"])
+        doctor_id = int(record["doctor_id"])
+    except KeyError as e:
+        raise ValueError(f"{e.args[0]} is required")
+    except (TypeError, ValueError):
+        raise ValueError("patient_id and doctor_id must be integers")
+
+    try:
+        anxiety_score = float(record["anxiety_score"])
+    except KeyError:
+        raise ValueError("anxiety_score is required")
+    except (TypeError, ValueError):
+        raise ValueError("anxiety_score must be a number")
+    if not 0 <= anxiety_score <= 100:
+        raise ValueError("anxiety_score must be between 0 and 100")
+
+    anxiety_level = record.get("anxiety_level")
+    if not anxiety_level or len(str(anxiety_level)) > 50:
+        raise ValueError("anxiety_level is required (max 50 characters)")
+
+    dominant_emotion = record.get("dominant_emotion")
+    if dominant_emotion is not None and len(str(dominant_emotion)) > 50:
+        raise ValueError("dominant_emotion must be at most 50 characters")
+
+    created_at = record.get("created_at")
+    if created_at is not None:
+        try:
+            created_at = datetime.strptime(str(created_at), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise ValueError("created_at must be formatted as YYYY-MM-DD HH:MM:SS")
+
+    emotion_vector = emotion_store.pack(record.get("emotion_probabilities"))
+
+    return (
+        patient_id,
+        doctor_id,
+        anxiety_score,
+        str(anxiety_level),
+        None if dominant_emotion is None else str(dominant_emotion),
+        row_key(record, index, request_key),
+        created_at,
+        emotion_vector
+    )
+
+
+# ----------------------------
+# Writing
+# ----------------------------
+def refresh_latest_for_patients(cursor, patient_ids):
+    # Set-based version of app.refresh_latest_assessment for a whole chunk
+    if not patient_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(patient_ids))
+    cursor.execute(f"""
+        UPDATE patients p
+        JOIN (
+            SELECT patient_id, MAX(id) AS max_id
+            FROM assessments
+            WHERE patient_id IN ({placeholders})
+            GROUP BY patient_id
+        ) latest ON latest.patient_id = p.id
+        JOIN assessments a ON a.id = latest.max_id
+        SET p.latest_assessment_id = a.id,
+            p.latest_anxiety_score = a.anxiety_score,
+            p.latest_anxiety_level = a.anxiety_level,
+            p.latest_dominant_emotion = a.dominant_emotion,
+            p.last_assessment_date = a.created_at
+        WHERE p.latest_assessment_id IS NULL OR p.latest_assessment_id < a.id
+    """, tuple(patient_ids))
+
+
+def _existing_keys(cursor, keys):
+    if not keys:
+        return set()
+    placeholders = ", ".join(["%s"] * len(keys))
+    cursor.execute(f"SELECT idempotency_key FROM assessments WHERE idempotency_key IN ({placeholders})", tuple(keys))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _insert_rows(cursor, rows):
+    plain = [row[:6] + (row[7],) for _, row in rows if row[6] is None]
+    timed = [row[:6] + (row[7], row[6]) for _, row in rows if row[6] is not None]
+    if plain:
+        cursor.executemany(INSERT_SQL, plain)
+    if timed:
+        cursor.executemany(INSERT_WITH_TIME_SQL, timed)
+
+
+def write_chunk(db, chunk, summary):
+    # chunk: list of (index, row). Commits once; falls back to row-by-row
+    # inserts if a concurrent retry raced us on an idempotency key.
+    cursor = db.cursor()
+    try:
+        existing = _existing_keys(cursor, [row[5] for _, row in chunk if row[5]])
+        fresh = []
+        for index, row in chunk:
+            if row[5] in existing:
+                summary["duplicates"].append(index)
+            else:
+                fresh.append((index, row))
+
+        try:
+            _insert_rows(cursor, fresh)
+            inserted = fresh
+        except MySQLdb.IntegrityError:
+            db.rollback()
+            inserted = []
+            for index, row in fresh:
+                try:
+                    _insert_rows(cursor, [(index, row)])
+                    inserted.append((index, row))
+                except MySQLdb.IntegrityError as e:
+                    if e.args[0] == 1062 and row[5]:
+                        summary["duplicates"].append(index)
+                    else:
+                        summary["errors"].append({"index": index, "error": str(e)})
+
+        refresh_latest_for_patients(cursor, sorted({row[0] for _, row in inserted}))
+        db.commit()
+
+        summary["inserted"] += len(inserted)
+        summary["doctor_ids"].update(row[1] for _, row in inserted)
+    finally:
+        cursor.close()
+
+
+def new_summary():
+    return {"received": 0, "inserted": 0, "duplicates": [], "errors": [], "doctor_ids": set()}
+
+
+def _write_pooled(connect, chunk, summary):
+    db = connect()
+    try:
+        write_chunk(db, chunk, summary)
+    finally:
+        db.close()
+
+
+def ingest(connect, records, summary, request_key=None, chunk_size=BULK_CHUNK_SIZE):
+    # connect() returns a DB connection; one is taken per chunk and closed
+    # (returned to the pool) right after it commits. summary (from
+    # new_summary) is filled in as chunks commit, so callers can still
+    # report progress if the payload turns out to be malformed
+    chunk = []
+
+    for index, record, error in records:
+        summary["received"] += 1
+        if summary["received"] > BULK_MAX_ROWS:
+            raise InvalidBulkPayload(f"At most {BULK_MAX_ROWS} rows per request")
+
+        if error is None:
+            try:
+                chunk.append((index, validate(record, index, request_key)))
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            summary["errors"].append({"index": index, "error": error})
+
+        if len(chunk) >= chunk_size:
+            _write_pooled(connect, chunk, summary)
+            chunk = []
+
+    if chunk:
+        _write_pooled(connect, chunk, summary)
+    return summary
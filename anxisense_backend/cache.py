@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# ----------------------------
+# Result caches
+# ----------------------------
+# Small key/value caches with a per-entry TTL. TTLCache is a bounded
+# in-process LRU. RedisCache shares entries between processes and hosts
+# (needs the optional `redis` package). Both count hits and misses under
+# their name in the metrics registry and keep a running hit ratio.
+#
+# Each cache also keeps generation counters that never expire. A reader
+# notes the generation before computing a value and folds it into the key;
+# a writer bumps it to invalidate. A value computed from data read before
+# the bump then lands under a key nobody asks for, instead of overwriting
+# the invalidation.
+#
+#   CACHE_BACKEND    "memory" (default) or "redis"
+#   CACHE_REDIS_URL  redis://host:6379/0 when CACHE_BACKEND=redis
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+REQUESTS = metrics.counter("cache_requests_total", "Cache lookups by result", ["cache", "result"])
+HIT_RATIO = metrics.gauge("cache_hit_ratio", "Share of lookups served from the cache", ["cache"])
+
+
+def _record(name, hit):
+    REQUESTS.inc(cache=name, result="hit" if hit else "miss")
+    HIT_RATIO.set(hit_ratio(name), cache=name)
+
+
+def hit_ratio(name):
+    samples = REQUESTS.samples()
+    hits = samples.get((name, "hit"), 0)
+    total = hits + samples.get((name, "miss"), 0)
+    return round(hits / total, 4) if total else 0.0
+
+
+class TTLCache:
+    def __init__(self, name, maxsize=1024, ttl=60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                _record(self.name, True)
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+        _record(self.name, False)
+        return None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def generation(self, scope):
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def bump(self, scope):
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+            return self._generations[scope]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class RedisCache:
+    # Values must be JSON-serializable
+    def __init__(self, name, url=CACHE_REDIS_URL, ttl=60.0):
+        import redis
+
+        self.name = name
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key):
+        return f"anxisense:{self.name}:{key}"
+
+    def get(self, key):
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            _record(self.name, False)
+            return None
+        _record(self.name, True)
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl_ms = int(1000 * (self.ttl if ttl is None else ttl))
+        self._client.set(self._key(key), json.dumps(value), px=max(1, ttl_ms))
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(self._key("*")):
+            self._client.delete(key)
+
+    def generation(self, scope):
+        return int(self._client.get(self._key(f"gen:{scope}")) or 0)
+
+    def bump(self, scope):
+        return self._client.incr(self._key(f"gen:{scope}"))
+
+
+def make_cache(name, maxsize=1024, ttl=60.0):
+    if CACHE_BACKEND == "redis":
+        return RedisCache(name, ttl=ttl)
+    return TTLCache(name, maxsize=maxsize, ttl=ttl)
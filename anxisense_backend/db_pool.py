@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import deque
+
+import metrics
+
+# ----------------------------
+# MySQL connection pool
+# ----------------------------
+# Bounded, thread-safe pool of open connections. acquire() hands out a
+# PooledConnection whose close() returns it to the pool instead of
+# disconnecting, so existing `finally: db.close()` handlers work unchanged.
+# Idle connections are pinged after ping_after seconds and replaced after
+# idle_timeout seconds; broken ones are dropped on release. Checkout wait
+# and cursor execute() time are also recorded as the "db_acquire" and
+# "query" request phases (see metrics.phase).
+
+WAIT_SECONDS = metrics.histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check a connection out of the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+IN_USE = metrics.gauge("db_pool_connections_in_use", "Connections currently checked out")
+OPEN = metrics.gauge("db_pool_connections_open", "Connections currently open (idle + in use)")
+TIMEOUTS = metrics.counter("db_pool_timeouts_total", "Checkouts that gave up waiting for a free connection")
+RECONNECTS = metrics.counter("db_pool_reconnects_total", "Idle connections replaced after a failed ping or idle timeout")
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class TimedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args, **kwargs):
+        with metrics.phase("query"):
+            return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        with metrics.phase("query"):
+            return self._cursor.executemany(*args, **kwargs)
+
+
+class PooledConnection:
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        # Return to the pool; safe to call more than once
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=6, timeout=10.0, ping_after=30.0, idle_timeout=600.0):
+        self._connect = connect
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.idle_timeout = idle_timeout
+        self._idle = deque()  # (connection, last_used)
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        last_used = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()  # LIFO keeps hot connections hot
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    OPEN.set(self._open)
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._open >= self.size:
+                        TIMEOUTS.inc()
+                        raise PoolTimeout(f"No database connection available after {self.timeout}s")
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            else:
+                conn = self._revalidate(conn, time.monotonic() - last_used)
+        except Exception:
+            self._forget()
+            raise
+
+        waited = time.perf_counter() - start
+        WAIT_SECONDS.observe(waited)
+        metrics.record_phase("db_acquire", waited)
+        IN_USE.inc()
+        return PooledConnection(self, conn)
+
+    def _revalidate(self, conn, idle_for):
+        if idle_for > self.idle_timeout:
+            self._close_quietly(conn)
+            RECONNECTS.inc()
+            return self._connect()
+        if idle_for > self.ping_after:
+            try:
+                conn.ping()
+            except Exception:
+                self._close_quietly(conn)
+                RECONNECTS.inc()
+                return self._connect()
+        return conn
+
+    def release(self, conn):
+        IN_USE.dec()
+        try:
+            # End any open transaction so the next user gets a fresh snapshot
+            conn.rollback()
+        except Exception:
+            self._close_quietly(conn)
+            self._forget()
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _forget(self):
+        with self._cond:
+            self._open -= 1
+            OPEN.set(self._open)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._open -= 1
+            OPEN.set(self._open)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -1,36 +1,13 @@
 from flask import Flask, request, jsonify
 from deepface import DeepFace
 import os
-from datetime import datetime
+import image_io
+import scoring
 
 app = Flask(__name__)
 
+# Only used when SPILL_UPLOADS_TO_DISK is enabled for debugging
 UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-# ----------------------------
-# Anxiety score calculation
-# ----------------------------
-def calculate_anxiety(emotions):
-    fear = float(emotions.get("fear", 0))
-    sad = float(emotions.get("sad", 0))
-    surprise = float(emotions.get("surprise", 0))
-
-    anxiety_score = (
-        0.5 * fear +
-        0.3 * sad +
-        0.2 * surprise
-    )
-
-    if anxiety_score < 30:
-        level = "Low"
-    elif anxiety_score < 60:
-        level = "Moderate"
-    else:
-        level = "High"
-
-    return round(anxiety_score, 2), level
-
 
 # ----------------------------
 # API endpoint
@@ -42,13 +19,19 @@ def analyze_face():
 
     image_file = request.files["image"]
 
-    filename = f"{datetime.now().timestamp()}.jpg"
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    image_file.save(filepath)
+    filepath = None
+    try:
+        if image_io.SPILL_UPLOADS_TO_DISK:
+            filepath = image_io.spill_to_disk(image_file, UPLOAD_FOLDER)
+            img = filepath
+        else:
+            img = image_io.read_upload(image_file)
+    except image_io.InvalidImage as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
         result = DeepFace.analyze(
-            img_path=filepath,
+            img_path=img,
             actions=["emotion"],
             enforce_detection=False
         )
@@ -60,7 +43,7 @@ def analyze_face():
 
         dominant_emotion = result[0]["dominant_emotion"]
 
-        anxiety_score, anxiety_level = calculate_anxiety(emotions)
+        anxiety_score, anxiety_level = scoring.score(emotions)
 
         response = {
             "dominant_emotion": dominant_emotion,
@@ -75,7 +58,7 @@ def analyze_face():
         return jsonify({"error": str(e)}), 500
 
     finally:
-        if os.path.exists(filepath):
+        if filepath and os.path.exists(filepath):
             os.remove(filepath)
 
 
@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+
+# ----------------------------
+# ONNX emotion runtime
+# ----------------------------
+# Runs an exported (and usually int8-quantized) copy of DeepFace's emotion
+# CNN on ONNX Runtime instead of building the Keras graph. Selected with
+# EMOTION_RUNTIME=onnx in model_manager; produce the model file with
+# scripts/export_emotion_onnx.py. Needs the optional packages in
+# requirements-onnx.txt.
+#
+#   EMOTION_ONNX_PATH     exported model (default models/emotion_int8.onnx)
+#   EMOTION_ONNX_THREADS  intra-op threads (0 = ONNX Runtime default)
+
+EMOTION_ONNX_PATH = os.getenv(
+    "EMOTION_ONNX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "emotion_int8.onnx")
+)
+EMOTION_ONNX_THREADS = int(os.getenv("EMOTION_ONNX_THREADS", "0"))
+
+
+class OnnxEmotionModel:
+    def __init__(self, path=EMOTION_ONNX_PATH, threads=EMOTION_ONNX_THREADS):
+        import onnxruntime as ort
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; run scripts/export_emotion_onnx.py first")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = path
+        self._session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input = self._session.get_inputs()[0].name
+
+    def predict_on_batch(self, batch):
+        # Same contract as the Keras model: (N, 48, 48, 1) float32 -> (N, 7)
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self._session.run(None, {self._input: batch})[0]
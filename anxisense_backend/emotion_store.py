@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+
+from scoring import EMOTION_LABELS
+
+# ----------------------------
+# Packed emotion vectors
+# ----------------------------
+# assessments.emotion_vector holds the 7 emotion percentages of a scan as
+# fixed-width binary: little-endian float32 in EMOTION_LABELS order, 28
+# bytes per row (vs ~150 as JSON text). Rows load straight into an
+# (N, 7) NumPy matrix with one frombuffer call for analytics and
+# re-scoring.
+
+VECTOR_DTYPE = np.dtype("<f4")
+VECTOR_BYTES = VECTOR_DTYPE.itemsize * len(EMOTION_LABELS)
+
+
+class InvalidVector(ValueError):
+    pass
+
+
+def pack(emotions):
+    # {"angry": 1.2, ...} (missing labels count as 0) -> 28 bytes; None passes through
+    if emotions is None:
+        return None
+    if not isinstance(emotions, dict):
+        raise InvalidVector("emotion_probabilities must be an object of emotion -> percentage")
+
+    unknown = set(emotions) - set(EMOTION_LABELS)
+    if unknown:
+        raise InvalidVector(f"Unknown emotions: {', '.join(sorted(unknown))}")
+    try:
+        values = [float(emotions.get(label, 0)) for label in EMOTION_LABELS]
+    except (TypeError, ValueError):
+        raise InvalidVector("emotion_probabilities values must be numbers")
+    if not all(math.isfinite(v) and 0 <= v <= 100 for v in values):
+        raise InvalidVector("emotion_probabilities values must be between 0 and 100")
+
+    return np.asarray(values, dtype=VECTOR_DTYPE).tobytes()
+
+
+def unpack(blob):
+    if blob is None:
+        return None
+    values = np.frombuffer(blob, dtype=VECTOR_DTYPE)
+    return {label: round(float(v), 4) for label, v in zip(EMOTION_LABELS, values)}
+
+
+def to_matrix(blobs):
+    # Blobs (None allowed) -> (N, 7) float32, NaN rows where no vector is stored
+    blobs = list(blobs)
+    present = np.array([b is not None for b in blobs], dtype=bool)
+    matrix = np.full((len(blobs), len(EMOTION_LABELS)), np.nan, dtype=VECTOR_DTYPE)
+    if present.any():
+        packed = b"".join(bytes(b) for b in blobs if b is not None)
+        matrix[present] = np.frombuffer(packed, dtype=VECTOR_DTYPE).reshape(-1, len(EMOTION_LABELS))
+    return matrix
+
+
+def iter_matrices(cursor, chunk_size=50000, doctor_id=None):
+    # Yields (ids, (n, 7) matrix) for every assessment that has a stored
+    # vector, keyset-paged by id so memory stays bounded
+    where = "emotion_vector IS NOT NULL AND id > %s"
+    params = []
+    if doctor_id is not None:
+        where += " AND doctor_id = %s"
+        params.append(doctor_id)
+
+    after_id = 0
+    while True:
+        cursor.execute(
+            f"SELECT id, emotion_vector FROM assessments WHERE {where} ORDER BY id LIMIT %s",
+            (after_id, *params, chunk_size)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        after_id = rows[-1][0]
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        yield ids, to_matrix(r[1] for r in rows)
+
+
+def row_for_json(row):
+    # Dict row from a SELECT a.* -> emotion_vector decoded as emotion_probabilities
+    if "emotion_vector" in row:
+        row = dict(row)
+        row["emotion_probabilities"] = unpack(row.pop("emotion_vector"))
+    return row
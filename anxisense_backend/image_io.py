@@ -0,0 +1,105 @@
+import io
+import os
+import uuid
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# ----------------------------
+# Upload decoding
+# ----------------------------
+# Uploads are decoded straight from the request stream into a BGR NumPy
+# array. SPILL_UPLOADS_TO_DISK keeps the old save-to-uploads/ path around
+# for debugging only (e.g. to inspect what a client actually sent).
+#
+# Large photos are never decoded at full size: the header is read first,
+# JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg itself, and the
+# result is area-downscaled to at most MAX_DECODE_PIXELS. The face
+# detector only needs a few hundred pixels across a face.
+#
+#   MAX_DECODE_PIXELS  pixel budget for a decoded upload (default ~1.2 MP)
+#   MAX_UPLOAD_PIXELS  uploads whose header claims more are rejected
+
+SPILL_UPLOADS_TO_DISK = os.getenv("SPILL_UPLOADS_TO_DISK", "false").lower() in ("1", "true", "yes")
+MAX_DECODE_PIXELS = int(os.getenv("MAX_DECODE_PIXELS", str(1280 * 960)))
+MAX_UPLOAD_PIXELS = int(os.getenv("MAX_UPLOAD_PIXELS", str(64 * 1000 * 1000)))
+
+# libjpeg scale factors exposed by OpenCV
+REDUCED_FLAGS = {8: cv2.IMREAD_REDUCED_COLOR_8, 4: cv2.IMREAD_REDUCED_COLOR_4, 2: cv2.IMREAD_REDUCED_COLOR_2}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def image_header(data):
+    # (format, width, height) without decoding pixels; None if PIL can't tell
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            return im.format, im.width, im.height
+    except Image.DecompressionBombError:
+        # PIL refuses headers past ~179 MP outright
+        raise InvalidImage("Image is too large")
+    except Exception:
+        return None
+
+
+def reduction_factor(width, height, max_pixels=MAX_DECODE_PIXELS):
+    # Smallest libjpeg scale that fits the budget, so most photos need no
+    # resize after decoding (a 12 MP photo decodes at 1/4 to ~0.76 MP)
+    for factor in (1, 2, 4, 8):
+        if (width // factor) * (height // factor) <= max_pixels:
+            return factor
+    return 8
+
+
+def cap_pixels(img, max_pixels=MAX_DECODE_PIXELS):
+    h, w = img.shape[:2]
+    if h * w <= max_pixels:
+        return img
+    scale = (max_pixels / float(h * w)) ** 0.5
+    size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def decode_image(data, max_pixels=MAX_DECODE_PIXELS):
+    if not data:
+        raise InvalidImage("Uploaded image is empty")
+
+    flag = cv2.IMREAD_COLOR
+    header = image_header(data)
+    if header:
+        fmt, width, height = header
+        if width * height > MAX_UPLOAD_PIXELS:
+            raise InvalidImage(f"Image is too large ({width}x{height})")
+        if fmt == "JPEG":
+            flag = REDUCED_FLAGS.get(reduction_factor(width, height, max_pixels), flag)
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    img = cv2.imdecode(buf, flag)
+    if img is None:
+        raise InvalidImage("Uploaded file is not a readable image")
+    return cap_pixels(img, max_pixels)
+
+
+def perceptual_hash(img, hash_size=16, dead_zone=2):
+    # Difference hash: sign of horizontal gradients on a tiny grayscale
+    # thumbnail. Gradients within dead_zone grey levels count as flat, so
+    # sensor noise and re-encoding on an unchanged frame keep the same bits.
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] - small[:, :-1]) > dead_zone
+    return np.packbits(bits).tobytes().hex()
+
+
+def read_upload(file_storage):
+    return decode_image(file_storage.stream.read())
+
+
+def spill_to_disk(file_storage, folder):
+    # uuid rather than a timestamp so concurrent scans never share a filename
+    os.makedirs(folder, exist_ok=True)
+    filepath = os.path.join(folder, f"{uuid.uuid4().hex}.jpg")
+    file_storage.save(filepath)
+    return filepath
@@ -0,0 +1,91 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+import metrics
+
+# ----------------------------
+# Micro-batching inference scheduler
+# ----------------------------
+# Request threads submit one preprocessed face each. A single scheduler
+# thread gathers whatever arrives within max_wait_ms (or until
+# max_batch_size is reached), runs one batched forward pass and hands each
+# caller back its own row of the output.
+
+QUEUE_DEPTH = metrics.gauge(
+    "inference_queue_depth", "Faces waiting for the next emotion batch", ["batcher"])
+BATCH_SIZE = metrics.histogram(
+    "inference_batch_size", "Faces per batched emotion forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64), labelnames=["batcher"])
+BATCH_SECONDS = metrics.histogram(
+    "inference_batch_seconds", "Wall time of one batched emotion forward pass", labelnames=["batcher"])
+
+
+class _Pending:
+    __slots__ = ("item", "result", "error", "done")
+
+    def __init__(self, item):
+        self.item = item
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class InferenceBatcher:
+    def __init__(self, runner, max_batch_size=8, max_wait_ms=5.0, name="emotion"):
+        # runner takes an (N, ...) array and returns N output rows
+        self.runner = runner
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"{name}-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item, timeout=None):
+        pending = _Pending(item)
+        self._queue.put(pending)
+        QUEUE_DEPTH.set(self._queue.qsize(), batcher=self.name)
+
+        if not pending.done.wait(timeout):
+            raise TimeoutError(f"{self.name} batch did not complete within {timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Window closed; still take anything already queued
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            QUEUE_DEPTH.set(self._queue.qsize(), batcher=self.name)
+            BATCH_SIZE.observe(len(batch), batcher=self.name)
+
+            try:
+                with BATCH_SECONDS.time(batcher=self.name):
+                    outputs = self.runner(np.stack([p.item for p in batch]))
+                if len(outputs) != len(batch):
+                    raise RuntimeError(f"{self.name} runner returned {len(outputs)} rows for {len(batch)} inputs")
+                for pending, output in zip(batch, outputs):
+                    pending.result = output
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
@@ -0,0 +1,300 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import logs
+import metrics
+
+# ----------------------------
+# Process-pool inference workers
+# ----------------------------
+# With INFERENCE_WORKERS > 0 the emotion pipeline runs in separate worker
+# processes, each holding its own warm model_manager, so TensorFlow never
+# ties up the waitress threads that serve the DB endpoints. Decoded images
+# are handed over through shared memory rather than pickled.
+#
+# This module exposes the same start/status/is_ready/wait_until_ready/
+# analyze/analyze_batch interface as model_manager, so app.py can use either one.
+#
+#   INFERENCE_WORKERS         number of worker processes (0 = in-process)
+#   INFERENCE_WORKER_THREADS  TensorFlow/OpenMP threads per worker
+#   INFERENCE_WORKER_CPUS     CPU pinning: "auto" to split the available
+#                             cores evenly, or explicit per-worker sets such
+#                             as "0,1;2,3" (assigned round-robin)
+#   INFERENCE_TIMEOUT         seconds a request waits for its worker
+#   INFERENCE_WARMUP_TIMEOUT  seconds every worker gets to load its model
+#                             before the pool is reported as failed
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_WORKER_THREADS = int(os.getenv("INFERENCE_WORKER_THREADS", "1"))
+INFERENCE_WORKER_CPUS = os.getenv("INFERENCE_WORKER_CPUS", "").strip()
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "60"))
+INFERENCE_WARMUP_TIMEOUT = float(os.getenv("INFERENCE_WARMUP_TIMEOUT", "600"))
+
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+IN_FLIGHT = metrics.gauge("inference_worker_tasks_in_flight", "Analyses currently running in worker processes")
+TASK_SECONDS = metrics.histogram("inference_worker_task_seconds", "Round trip of one analysis through the worker pool")
+
+log = logs.get_logger("workers")
+
+_state = STATE_LOADING
+_error = None
+_done = threading.Event()
+_lock = threading.Lock()
+_executor = None
+_barrier = None  # worker side: shared by the warm-up pings
+
+
+class ModelNotReady(RuntimeError):
+    pass
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+def _cpu_sets(spec, workers):
+    if not spec:
+        return []
+    if spec == "auto":
+        if not hasattr(os, "sched_getaffinity"):
+            return []
+        cpus = sorted(os.sched_getaffinity(0))
+        per_worker = max(1, len(cpus) // max(1, workers))
+        return [set(cpus[i * per_worker:(i + 1) * per_worker]) or {cpus[i % len(cpus)]} for i in range(workers)]
+
+    sets = []
+    for group in spec.split(";"):
+        cpus = set()
+        for part in group.split(","):
+            part = part.strip()
+            if "-" in part:
+                lo, hi = part.split("-", 1)
+                cpus.update(range(int(lo), int(hi) + 1))
+            elif part:
+                cpus.add(int(part))
+        if cpus:
+            sets.append(cpus)
+    return sets
+
+
+def _init_worker(counter, barrier, cpu_sets, threads):
+    global _barrier
+    _barrier = barrier
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    if cpu_sets and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_sets[index % len(cpu_sets)])
+
+    # Must be set before TensorFlow is imported
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ["EMOTION_ONNX_THREADS"] = str(threads)
+
+    import model_manager
+    if model_manager.uses_tensorflow():
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    _load_model(index)
+
+
+def _load_model(index):
+    import model_manager
+
+    # A worker runs one task at a time, so its batcher can never gather a
+    # second face: no batching window. Passed explicitly because spawn has
+    # already imported model_manager (via the main script) before this runs.
+    model_manager.start(max_wait_ms=0)
+    if not model_manager.wait_until_ready():
+        raise RuntimeError(f"Worker {index} failed to load the emotion model: {model_manager.last_error()}")
+    log.info("Inference worker ready", extra={"worker": index, "pid": os.getpid()})
+
+
+def _worker_ping(timeout):
+    # Blocks until every worker holds a ping, so no worker can answer two
+    _barrier.wait(timeout)
+    return os.getpid()
+
+
+def _timed(fn, *args):
+    # Phase timings recorded in a worker never reach the web process's
+    # registry, so they travel back alongside the result
+    metrics.start_phases()
+    try:
+        result = fn(*args)
+    finally:
+        timings = metrics.stop_phases()
+    return result, timings
+
+
+def _worker_analyze(img):
+    import model_manager
+    return _timed(model_manager.analyze, img)
+
+
+def _worker_analyze_shared(name, shape, dtype):
+    import model_manager
+
+    # Workers share the parent's resource tracker, so attaching here needs
+    # no bookkeeping: the parent's unlink() releases the segment
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        img = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        result = _timed(model_manager.analyze, img)
+        del img
+        return result
+    finally:
+        shm.close()
+
+
+def _worker_analyze_batch_shared(name, shape, dtype):
+    import model_manager
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        frames = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        results = _timed(model_manager.analyze_batch, list(frames))
+        del frames
+        return results
+    finally:
+        shm.close()
+
+
+# ----------------------------
+# Web-process side
+# ----------------------------
+def _warm_up(executor, workers):
+    global _state, _error
+    try:
+        # One ping per worker forces every process to spawn and finish
+        # loading its model before we report ready
+        futures = [executor.submit(_worker_ping, INFERENCE_WARMUP_TIMEOUT) for _ in range(workers)]
+        pids = {f.result() for f in futures}
+        if len(pids) != workers:
+            raise RuntimeError(f"Only {len(pids)} of {workers} inference workers started")
+        _state = STATE_READY
+        log.info("Inference worker pool ready", extra={"warmed": len(pids), "workers": workers})
+    except Exception as e:
+        _error = str(e) or type(e).__name__  # a timed-out barrier has no message
+        _state = STATE_FAILED
+        log.error("Inference worker pool failed to start", extra={"error": _error})
+    finally:
+        _done.set()
+
+
+def start(workers=None):
+    global _executor
+    workers = workers or INFERENCE_WORKERS
+    with _lock:
+        if _executor is not None:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(ctx.Value("i", 0), ctx.Barrier(workers), _cpu_sets(INFERENCE_WORKER_CPUS, workers),
+                      INFERENCE_WORKER_THREADS)
+        )
+        threading.Thread(target=_warm_up, args=(_executor, workers), name="worker-warmup", daemon=True).start()
+
+
+def status():
+    return _state
+
+
+def last_error():
+    return _error
+
+
+def is_ready():
+    return _state == STATE_READY
+
+
+def wait_until_ready(timeout=None):
+    _done.wait(timeout)
+    return is_ready()
+
+
+def _pool_broken(e):
+    # A worker died (OOM kill, segfault in native code): the executor
+    # refuses all further work, so report it instead of staying "ready"
+    global _state, _error
+    _error = f"Inference worker pool broke: {e}"
+    _state = STATE_FAILED
+    log.error("Inference worker pool broke", extra={"error": str(e)})
+    return ModelNotReady(_error)
+
+
+def _record_timings(outcome):
+    result, timings = outcome
+    for name, seconds in timings.items():
+        metrics.record_phase(name, seconds)
+    return result
+
+
+def _result(future):
+    try:
+        return future.result(INFERENCE_TIMEOUT)
+    except FutureTimeout:
+        # Drop it if still queued; a running task can't be interrupted
+        future.cancel()
+        raise ModelNotReady(f"Inference workers did not answer within {INFERENCE_TIMEOUT:g}s")
+
+
+def _run_shared(task, arr):
+    arr = np.ascontiguousarray(arr)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+    try:
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        return _result(_executor.submit(task, shm.name, arr.shape, arr.dtype.str))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def analyze(img):
+    if not is_ready():
+        raise ModelNotReady(f"Inference workers are {_state}")
+
+    IN_FLIGHT.inc()
+    start_time = time.perf_counter()
+    try:
+        if isinstance(img, str):
+            # Spill-to-disk debug mode: the worker can read the file itself
+            return _record_timings(_result(_executor.submit(_worker_analyze, img)))
+        return _record_timings(_run_shared(_worker_analyze_shared, img))
+    except BrokenProcessPool as e:
+        raise _pool_broken(e) from e
+    finally:
+        IN_FLIGHT.dec()
+        TASK_SECONDS.observe(time.perf_counter() - start_time)
+
+
+def analyze_batch(imgs):
+    # Frames must share one shape (see sequence.uniform_size)
+    if not is_ready():
+        raise ModelNotReady(f"Inference workers are {_state}")
+
+    IN_FLIGHT.inc()
+    start_time = time.perf_counter()
+    try:
+        return _record_timings(_run_shared(_worker_analyze_batch_shared, np.stack(imgs)))
+    except BrokenProcessPool as e:
+        raise _pool_broken(e) from e
+    finally:
+        IN_FLIGHT.dec()
+        TASK_SECONDS.observe(time.perf_counter() - start_time)
@@ -0,0 +1,85 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+# ----------------------------
+# Structured, non-blocking logging
+# ----------------------------
+# Every backend logger ("anxisense.*") hands its records to a queue; one
+# listener thread formats them and writes to stdout, so a request thread
+# never blocks on a slow or piped terminal. Fields passed with extra={...}
+# become keys of the JSON line:
+#
+#   log.info("analysis", extra={"dominant_emotion": "fear", "anxiety_score": 41.2})
+#   -> {"ts": "...", "level": "INFO", "logger": "anxisense.app", "msg": "analysis", "dominant_emotion": "fear", ...}
+#
+#   LOG_LEVEL   minimum level (default INFO)
+#   LOG_FORMAT  "json" (default) or "text" for plain lines while developing
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={json.dumps(v, default=str, ensure_ascii=False)}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+_listener = None
+
+
+def setup():
+    # Safe to call more than once; the first call wins
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger("anxisense")
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name):
+    setup()
+    return logging.getLogger(f"anxisense.{name}")
@@ -0,0 +1,190 @@
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from email.message import EmailMessage
+
+import logs
+import metrics
+
+# ----------------------------
+# Background mail dispatcher
+# ----------------------------
+# Request threads only put messages on a bounded queue; one worker thread
+# delivers them. The worker keeps its authenticated SMTP session open and
+# reuses it for every message that arrives before MAIL_IDLE_TIMEOUT, so a
+# burst of OTP mails pays for connect + TLS + login once. Transient
+# failures (network errors, dropped sessions, 4xx replies) are retried with
+# exponential backoff; permanent 5xx replies are not.
+#
+#   MAIL_QUEUE_SIZE    messages waiting before enqueue() refuses (default 1000)
+#   MAIL_MAX_RETRIES   extra attempts per message (default 3)
+#   MAIL_RETRY_BASE    first backoff in seconds, doubled each retry (default 2)
+#   MAIL_IDLE_TIMEOUT  seconds an unused SMTP session stays open (default 60)
+#
+# The server itself is configured with the existing EMAIL_* variables.
+
+MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", "1000"))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "3"))
+MAIL_RETRY_BASE = float(os.getenv("MAIL_RETRY_BASE", "2"))
+MAIL_IDLE_TIMEOUT = float(os.getenv("MAIL_IDLE_TIMEOUT", "60"))
+
+QUEUE_DEPTH = metrics.gauge("mail_queue_depth", "Outbound mails waiting to be sent")
+SEND_SECONDS = metrics.histogram("mail_send_seconds", "Wall time of one SMTP delivery attempt")
+MAILS = metrics.counter("mail_messages_total", "Outbound mails by outcome", ["result"])
+CONNECTIONS = metrics.counter("mail_connections_total", "SMTP sessions opened (connect + login)")
+
+log = logs.get_logger("mail")
+
+_STOP = object()
+
+
+def _transient(error):
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+class MailDispatcher:
+    def __init__(self, host, port, user, password, use_ssl=False, timeout=30,
+                 max_retries=MAIL_MAX_RETRIES, retry_base=MAIL_RETRY_BASE,
+                 idle_timeout=MAIL_IDLE_TIMEOUT, queue_size=MAIL_QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.retry_base = max(0.0, float(retry_base))
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._server = None
+        self._thread = threading.Thread(target=self._loop, name="mail-dispatcher", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, to, subject, body):
+        # -> False when the queue is full; the caller decides what to tell the user
+        msg = EmailMessage()
+        msg.set_content(body)
+        msg["Subject"] = subject
+        msg["From"] = self.user
+        msg["To"] = to
+        try:
+            self._queue.put_nowait(msg)
+        except queue.Full:
+            MAILS.inc(result="dropped")
+            return False
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    def join(self):
+        # Block until everything queued so far has been handled
+        self._queue.join()
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _connect(self):
+        context = ssl.create_default_context()
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, context=context, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            # Use STARTTLS for typical submission ports
+            if self.port == 587:
+                server.starttls(context=context)
+        server.login(self.user, self.password)
+        CONNECTIONS.inc()
+        return server
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+    def _deliver(self, msg):
+        attempt = 0
+        while True:
+            reused = self._server is not None
+            try:
+                with SEND_SECONDS.time():
+                    if self._server is None:
+                        self._server = self._connect()
+                    self._server.send_message(msg)
+                MAILS.inc(result="sent")
+                return
+            except Exception as e:
+                dropped = isinstance(e, smtplib.SMTPServerDisconnected)
+                if dropped:
+                    self._server = None
+                else:
+                    self._disconnect()
+                # A session the server closed while idle is not a real failure
+                if reused and dropped:
+                    continue
+                if not _transient(e) or attempt >= self.max_retries:
+                    log.error("Could not send email", extra={"to": msg["To"], "error": str(e), "attempts": attempt + 1})
+                    MAILS.inc(result="failed")
+                    return
+                MAILS.inc(result="retried")
+                time.sleep(self.retry_base * (2 ** attempt))
+                attempt += 1
+
+    def _loop(self):
+        while True:
+            try:
+                msg = self._queue.get(timeout=self.idle_timeout if self._server else None)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            try:
+                if msg is _STOP:
+                    self._disconnect()
+                    return
+                self._deliver(msg)
+            finally:
+                QUEUE_DEPTH.set(self._queue.qsize())
+                self._queue.task_done()
+
+
+def from_env():
+    # -> None when no mail account is configured
+    user = os.getenv("EMAIL_USER")
+    password = os.getenv("EMAIL_PASS")
+    if not user or not password:
+        log.error("EMAIL_USER or EMAIL_PASS not set in .env")
+        return None
+    return MailDispatcher(
+        host=os.getenv("EMAIL_HOST", "smtp.gmail.com"),
+        port=int(os.getenv("EMAIL_PORT", "587")),
+        user=user,
+        password=password,
+        use_ssl=os.getenv("EMAIL_USE_SSL", "false").lower() in ("1", "true", "yes"),
+        timeout=float(os.getenv("EMAIL_TIMEOUT", "30"))
+    )
+
+
+_dispatcher = None
+_lock = threading.Lock()
+
+
+def send(to, subject, body):
+    # Queue a mail on the shared dispatcher, started on first use.
+    # -> False when mail is not configured or the queue is full
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _dispatcher = from_env()
+    if _dispatcher is None:
+        return False
+    return _dispatcher.enqueue(to, subject, body)
@@ -0,0 +1,216 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# ----------------------------
+# In-process metrics registry
+# ----------------------------
+# Minimal thread-safe counters, gauges and histograms shared by the backend
+# modules. Metrics are created once at import time with counter()/gauge()/
+# histogram() and read back with snapshot() (JSON) or render_prometheus()
+# (Prometheus text exposition format).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = {"counts": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+                self._values[key] = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+            entry["count"] += 1
+            entry["sum"] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            return {
+                key: {"counts": list(v["counts"]), "count": v["count"], "sum": v["sum"]}
+                for key, v in self._values.items()
+            }
+
+
+def _get_or_create(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)
+            _registry[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+        return metric
+
+
+def counter(name, help_text, labelnames=()):
+    return _get_or_create(Counter, name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=()):
+    return _get_or_create(Gauge, name, help_text, labelnames)
+
+
+def histogram(name, help_text, buckets=DEFAULT_BUCKETS, labelnames=()):
+    return _get_or_create(Histogram, name, help_text, buckets, labelnames)
+
+
+def snapshot():
+    # JSON-friendly view of every registered metric
+    with _registry_lock:
+        metrics = list(_registry.values())
+
+    out = {}
+    for metric in metrics:
+        series = []
+        for key, value in metric.samples().items():
+            labels = dict(zip(metric.labelnames, key))
+            if metric.kind == "histogram":
+                buckets = {str(bound): count for bound, count in zip(metric.buckets, value["counts"])}
+                buckets["+Inf"] = value["count"]
+                series.append({"labels": labels, "count": value["count"], "sum": value["sum"], "buckets": buckets})
+            else:
+                series.append({"labels": labels, "value": value})
+        out[metric.name] = {"type": metric.kind, "help": metric.help, "series": series}
+    return out
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render_prometheus():
+    # Text format 0.0.4; histogram bucket counts are already cumulative
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(metric.samples().items()):
+            if metric.kind == "histogram":
+                for bound, count in zip(metric.buckets, value["counts"]):
+                    labels = _label_text(metric.labelnames, key, [("le", repr(float(bound)))])
+                    lines.append(f"{metric.name}_bucket{labels} {count}")
+                labels = _label_text(metric.labelnames, key, [("le", "+Inf")])
+                lines.append(f"{metric.name}_bucket{labels} {value['count']}")
+                labels = _label_text(metric.labelnames, key)
+                lines.append(f"{metric.name}_sum{labels} {value['sum']}")
+                lines.append(f"{metric.name}_count{labels} {value['count']}")
+            else:
+                lines.append(f"{metric.name}{_label_text(metric.labelnames, key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------
+# Request phases
+# ----------------------------
+# phase("detection") times one internal step of a request into
+# request_phase_seconds. Between start_phases() and stop_phases() the same
+# thread also collects its own per-phase totals, which is how the request
+# middleware logs where a slow request spent its time and how inference
+# worker processes hand their timings back to the parent.
+
+PHASE_SECONDS = histogram("request_phase_seconds", "Time spent in one internal phase of a request", labelnames=["phase"])
+
+_phases = threading.local()
+
+
+def record_phase(name, seconds):
+    PHASE_SECONDS.observe(seconds, phase=name)
+    timings = getattr(_phases, "timings", None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def start_phases():
+    _phases.timings = {}
+
+
+def stop_phases():
+    timings = getattr(_phases, "timings", None)
+    _phases.timings = None
+    return timings or {}
@@ -0,0 +1,114 @@
+import MySQLdb
+import os
+import sys
+from dotenv import load_dotenv
+
+import logs
+
+load_dotenv()
+
+# ----------------------------
+# Versioned schema migrations
+# ----------------------------
+# Applies migrations/NNNN_name.sql in order and records each applied
+# version in schema_migrations, so every file runs exactly once per
+# database. Statements that fail only because the object already exists
+# are skipped, which lets databases set up by the old ad-hoc scripts adopt
+# the runner without manual fixes.
+#
+#   python migrate.py            apply pending migrations
+#   python migrate.py --status   list applied / pending versions
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Table exists, duplicate column, duplicate key name
+ALREADY_APPLIED_ERRORS = (1050, 1060, 1061)
+
+log = logs.get_logger("migrate")
+
+
+def get_connection():
+    return MySQLdb.connect(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        passwd=os.getenv("DB_PASSWORD"),
+        db=os.getenv("DB_NAME"),
+        charset="utf8"
+    )
+
+
+def list_migrations():
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(f[:-4], os.path.join(MIGRATIONS_DIR, f)) for f in files]
+
+
+def split_statements(sql):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def run_migrations(db):
+    cursor = db.cursor()
+    try:
+        done = applied_versions(cursor)
+        applied = []
+
+        for version, path in list_migrations():
+            if version in done:
+                continue
+
+            with open(path, 'r') as f:
+                statements = split_statements(f.read())
+
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except MySQLdb.OperationalError as e:
+                    if e.args[0] in ALREADY_APPLIED_ERRORS:
+                        log.info("Migration statement already applied", extra={"version": version, "reason": e.args[1]})
+                    else:
+                        raise
+
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            db.commit()
+            applied.append(version)
+            log.info("Applied migration", extra={"version": version})
+
+        return applied
+    finally:
+        cursor.close()
+
+
+def print_status(db):
+    cursor = db.cursor()
+    try:
+        done = applied_versions(cursor)
+        for version, _ in list_migrations():
+            print(f"{'applied' if version in done else 'pending'}  {version}")
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    try:
+        db = get_connection()
+        if "--status" in sys.argv:
+            print_status(db)
+        else:
+            applied = run_migrations(db)
+            print(f"{len(applied)} migration(s) applied.")
+        db.close()
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,12 @@
+-- Patients table (previously created by hand, see schema_patients.txt)
+CREATE TABLE IF NOT EXISTS patients (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    patientid INT NULL,
+    doctorid INT NOT NULL,
+    fullname VARCHAR(255),
+    age VARCHAR(3),
+    gender VARCHAR(255),
+    proceduretype VARCHAR(255),
+    healthissue VARCHAR(255),
+    previousanxietyhistory VARCHAR(255)
+);
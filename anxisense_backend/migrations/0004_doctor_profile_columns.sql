@@ -0,0 +1,7 @@
+-- Add profile columns to doctors table
+-- (one column per statement so a partially migrated table can catch up)
+ALTER TABLE doctors ADD COLUMN fullname VARCHAR(255);
+ALTER TABLE doctors ADD COLUMN phone VARCHAR(20);
+ALTER TABLE doctors ADD COLUMN specialization VARCHAR(255);
+ALTER TABLE doctors ADD COLUMN clinic_name VARCHAR(255);
+ALTER TABLE doctors ADD COLUMN profile_image MEDIUMTEXT;
@@ -0,0 +1,2 @@
+-- Allow alphanumeric patient codes such as "T001"
+ALTER TABLE patients MODIFY COLUMN patientid VARCHAR(50);
@@ -0,0 +1,22 @@
+-- Denormalized copy of each patient's latest assessment.
+-- Kept in sync by save_assessment in the same transaction as the INSERT,
+-- so GET /api/patients no longer needs the MAX(id) correlated subquery.
+ALTER TABLE patients ADD COLUMN latest_assessment_id INT NULL;
+ALTER TABLE patients ADD COLUMN latest_anxiety_score FLOAT NULL;
+ALTER TABLE patients ADD COLUMN latest_anxiety_level VARCHAR(50) NULL;
+ALTER TABLE patients ADD COLUMN latest_dominant_emotion VARCHAR(50) NULL;
+ALTER TABLE patients ADD COLUMN last_assessment_date TIMESTAMP NULL;
+
+-- Backfill from existing assessments
+UPDATE patients p
+JOIN (
+    SELECT patient_id, MAX(id) AS max_id
+    FROM assessments
+    GROUP BY patient_id
+) latest ON latest.patient_id = p.id
+JOIN assessments a ON a.id = latest.max_id
+SET p.latest_assessment_id = a.id,
+    p.latest_anxiety_score = a.anxiety_score,
+    p.latest_anxiety_level = a.anxiety_level,
+    p.latest_dominant_emotion = a.dominant_emotion,
+    p.last_assessment_date = a.created_at;
@@ -0,0 +1,9 @@
+-- Indexes for the hot read paths
+-- GET /api/assessments?doctorid= and dashboard-stats: WHERE doctor_id = ? ORDER BY / range on created_at
+CREATE INDEX idx_assessments_doctor_created ON assessments (doctor_id, created_at);
+-- GET /api/assessments?patientid=: WHERE patient_id = ? ORDER BY created_at
+CREATE INDEX idx_assessments_patient_created ON assessments (patient_id, created_at);
+-- (patient_id, id) for latest-assessment lookups is already covered by the
+-- patient_id foreign-key index, since InnoDB appends the primary key
+-- GET /api/patients: WHERE doctorid = ? ORDER BY id DESC
+CREATE INDEX idx_patients_doctor ON patients (doctorid, id);
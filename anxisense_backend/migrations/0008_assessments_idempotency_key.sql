@@ -0,0 +1,4 @@
+-- Idempotency keys for POST /api/assessments/bulk, so retried syncs don't double insert
+-- (NULL for rows saved one at a time; a UNIQUE index allows any number of NULLs)
+ALTER TABLE assessments ADD COLUMN idempotency_key VARCHAR(64) NULL;
+CREATE UNIQUE INDEX uq_assessments_idempotency_key ON assessments (idempotency_key);
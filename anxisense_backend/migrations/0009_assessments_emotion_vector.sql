@@ -0,0 +1,4 @@
+-- Full 7-class emotion probabilities per assessment, packed as seven
+-- little-endian float32 values in scoring.EMOTION_LABELS order (see
+-- emotion_store.py). Fixed 28 bytes per row; NULL for older rows.
+ALTER TABLE assessments ADD COLUMN emotion_vector BINARY(28) NULL;
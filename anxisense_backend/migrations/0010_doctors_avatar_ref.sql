@@ -0,0 +1,4 @@
+-- Profile photos move out of doctors.profile_image (a base64 data URL) into
+-- avatar_store thumbnails; the row keeps only their content reference.
+-- Existing data URLs are converted the first time they are read.
+ALTER TABLE doctors ADD COLUMN avatar_ref CHAR(32) NULL;
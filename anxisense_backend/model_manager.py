@@ -0,0 +1,242 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import logs
+import metrics
+from inference_batcher import InferenceBatcher
+from scoring import EMOTION_LABELS
+
+# ----------------------------
+# Emotion model manager
+# ----------------------------
+# Loads the face detector and the emotion model once per process, runs a
+# warm-up inference on a synthetic frame and keeps both resident, so
+# /api/analyze never pays for the TensorFlow import and graph build.
+#
+# Analysis is split in two: face detection runs in the calling thread,
+# while the 48x48 emotion forward pass goes through a shared micro-batcher
+# so concurrent scans share one batched call instead of thrashing the CPU.
+#
+# DeepFace (and with it TensorFlow) is only imported by the loader thread,
+# so importing this module - and app.py - stays cheap for processes that
+# never run inference: CRUD-only instances, scripts, the web process when
+# inference runs in worker processes. With EMOTION_RUNTIME=onnx and the
+# opencv detector, DeepFace is not needed at all: faces are found with
+# OpenCV's Haar cascade directly (the same cascade DeepFace's "opencv"
+# backend uses, minus its eye-based alignment), so TensorFlow never loads.
+#
+#   FACE_DETECTOR_BACKEND  any DeepFace detector: opencv (default, Haar
+#                          cascade), mtcnn, retinaface, ssd, yunet, ...
+#                          Compare them with scripts/benchmark_detectors.py
+#   EMOTION_RUNTIME        "tensorflow" (default, DeepFace's Keras model) or
+#                          "onnx" (exported int8 model on ONNX Runtime, see
+#                          emotion_onnx.py); both give the same 7 outputs
+
+DETECTOR_BACKEND = os.getenv("FACE_DETECTOR_BACKEND", "opencv").strip().lower()
+EMOTION_RUNTIME = os.getenv("EMOTION_RUNTIME", "tensorflow").strip().lower()
+
+EMOTION_INPUT_SIZE = 48
+
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+log = logs.get_logger("model")
+
+_state = STATE_LOADING
+_error = None
+_done = threading.Event()
+_lock = threading.Lock()
+_loader = None
+
+_emotion_model = None
+_batcher = None
+
+
+class ModelNotReady(RuntimeError):
+    pass
+
+
+def _load(max_wait_ms):
+    global _state, _error, _emotion_model, _batcher
+    try:
+        if uses_tensorflow():
+            _deepface().build_model(task="face_detector", model_name=DETECTOR_BACKEND)
+        _emotion_model = load_emotion_model(EMOTION_RUNTIME)
+
+        # Warm-up pass so the first real scan doesn't trace the graph
+        frame = np.zeros((224, 224, 3), dtype=np.uint8)
+        face, _ = extract_face(frame)
+        predict_emotions(face[np.newaxis])
+
+        _batcher = InferenceBatcher(
+            predict_emotions,
+            max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=max_wait_ms,
+            name="emotion"
+        )
+
+        _state = STATE_READY
+        log.info("Emotion model loaded and warmed up", extra={"detector": DETECTOR_BACKEND, "runtime": EMOTION_RUNTIME})
+    except Exception as e:
+        _error = str(e)
+        _state = STATE_FAILED
+        log.error("Emotion model failed to load", extra={"error": str(e)})
+    finally:
+        _done.set()
+
+
+def _deepface():
+    from deepface import DeepFace
+    return DeepFace
+
+
+def uses_tensorflow(runtime=EMOTION_RUNTIME, detector_backend=DETECTOR_BACKEND):
+    # Only onnx + the opencv detector runs without DeepFace/TensorFlow
+    return runtime == "tensorflow" or detector_backend != "opencv"
+
+
+_cascade = None
+
+
+def _haar_cascade():
+    global _cascade
+    if _cascade is None:
+        _cascade = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml"))
+    return _cascade
+
+
+def load_emotion_model(runtime):
+    # Anything with predict_on_batch((N, 48, 48, 1)) -> (N, 7) probabilities
+    if runtime == "onnx":
+        import emotion_onnx
+        return emotion_onnx.OnnxEmotionModel()
+    if runtime == "tensorflow":
+        return _deepface().build_model(task="facial_attribute", model_name="Emotion").model
+    raise ValueError(f"Unknown EMOTION_RUNTIME '{runtime}' (expected tensorflow or onnx)")
+
+
+def start(max_wait_ms=None):
+    # Kick off loading in the background; safe to call more than once.
+    # max_wait_ms overrides the batching window (INFERENCE_MAX_WAIT_MS).
+    global _loader
+    if max_wait_ms is None:
+        max_wait_ms = INFERENCE_MAX_WAIT_MS
+    with _lock:
+        if _loader is None:
+            _loader = threading.Thread(target=_load, args=(max_wait_ms,), name="model-loader", daemon=True)
+            _loader.start()
+
+
+def status():
+    return _state
+
+
+def last_error():
+    return _error
+
+
+def is_ready():
+    return _state == STATE_READY
+
+
+def wait_until_ready(timeout=None):
+    _done.wait(timeout)
+    return is_ready()
+
+
+# ----------------------------
+# Pipeline stages
+# ----------------------------
+def to_emotion_input(face_rgb):
+    # DeepFace face crops are RGB floats in [0, 1]. Pad to a square (as
+    # DeepFace does before its emotion model), then grayscale and 48x48.
+    gray = cv2.cvtColor(face_rgb.astype(np.float32), cv2.COLOR_RGB2GRAY)
+    h, w = gray.shape
+    side = max(h, w)
+    if h != w:
+        top = (side - h) // 2
+        left = (side - w) // 2
+        gray = cv2.copyMakeBorder(gray, top, side - h - top, left, side - w - left, cv2.BORDER_CONSTANT, value=0)
+    return cv2.resize(gray, (EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE))
+
+
+def extract_face_opencv(img):
+    # Largest Haar-cascade face (DeepFace's opencv settings), or the whole
+    # frame when none is found
+    if isinstance(img, str):
+        img = cv2.imread(img)
+    h, w = img.shape[:2]
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    boxes = _haar_cascade().detectMultiScale(gray, 1.1, 10)
+    if len(boxes):
+        x, y, bw, bh = (int(v) for v in max(boxes, key=lambda b: b[2] * b[3]))
+    else:
+        x, y, bw, bh = 0, 0, w, h
+    crop = img[y:y + bh, x:x + bw, ::-1].astype(np.float32) / 255.0
+    return to_emotion_input(crop), {"x": x, "y": y, "w": bw, "h": bh}
+
+
+def extract_face(img, detector_backend=DETECTOR_BACKEND):
+    # Detect once and return the emotion-model input for the first face
+    # (enforce_detection=False: fall back to the whole frame)
+    if not uses_tensorflow(EMOTION_RUNTIME, detector_backend):
+        return extract_face_opencv(img)
+    faces = _deepface().extract_faces(
+        img_path=img,
+        detector_backend=detector_backend,
+        enforce_detection=False,
+        align=True
+    )
+    face = faces[0]
+    return to_emotion_input(face["face"]), face.get("facial_area")
+
+
+def predict_emotions(batch):
+    # (N, 48, 48) grayscale faces -> (N, 7) percentages summing to 100
+    batch = np.asarray(batch, dtype=np.float32)
+    if batch.ndim == 3:
+        batch = batch[..., np.newaxis]
+    probs = np.asarray(_emotion_model.predict_on_batch(batch), dtype=np.float64)
+    totals = probs.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    return 100.0 * probs / totals
+
+
+def to_result(probs, region=None):
+    emotions = {label: float(p) for label, p in zip(EMOTION_LABELS, probs)}
+    return {
+        "emotion": emotions,
+        "dominant_emotion": EMOTION_LABELS[int(np.argmax(probs))],
+        "region": region
+    }
+
+
+def analyze(img):
+    if not is_ready():
+        raise ModelNotReady(f"Emotion model is {_state}")
+
+    with metrics.phase("detection"):
+        face, region = extract_face(img)
+    with metrics.phase("inference"):
+        probs = _batcher.submit(face)
+    return to_result(probs, region)
+
+
+def analyze_batch(imgs):
+    # Several frames of one scan: detect per frame, then a single batched
+    # emotion pass (already a batch, so it skips the micro-batcher)
+    if not is_ready():
+        raise ModelNotReady(f"Emotion model is {_state}")
+
+    with metrics.phase("detection"):
+        detections = [extract_face(img) for img in imgs]
+    with metrics.phase("inference"):
+        probs = predict_emotions(np.stack([face for face, _ in detections]))
+    return [to_result(p, region) for p, (_, region) in zip(probs, detections)]
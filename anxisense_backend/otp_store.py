@@ -0,0 +1,134 @@
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import cache
+
+# ----------------------------
+# One-time login codes
+# ----------------------------
+# Pending OTPs live here instead of in doctors.otp, so sending and checking
+# a code never writes to the doctors table. Each code expires after OTP_TTL
+# seconds and is burned after OTP_MAX_ATTEMPTS wrong guesses; a correct
+# code is consumed on use. MemoryOtpStore is a bounded in-process dict (one
+# instance only); RedisOtpStore shares codes between processes and hosts
+# (needs the optional `redis` package). Both have issue()/verify().
+#
+#   OTP_TTL           seconds a code stays valid (default 600)
+#   OTP_MAX_ATTEMPTS  wrong guesses before the code is dropped (default 5)
+#   OTP_STORE_MAX     codes kept in memory, oldest dropped first (default 10000)
+#   OTP_BACKEND       "memory" (default) or "redis" (uses CACHE_REDIS_URL)
+
+OTP_TTL = float(os.getenv("OTP_TTL", "600"))
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_STORE_MAX = int(os.getenv("OTP_STORE_MAX", "10000"))
+OTP_BACKEND = os.getenv("OTP_BACKEND", "memory").lower()
+
+# verify() results
+VERIFIED = "verified"
+INVALID = "invalid"
+EXPIRED = "expired"  # also: never requested, or already used
+LOCKED = "locked"    # too many wrong guesses; a new code is needed
+
+
+def new_code():
+    return f"{secrets.randbelow(1000000):06d}"
+
+
+def _key(email):
+    return email.strip().lower()
+
+
+class MemoryOtpStore:
+    def __init__(self, ttl=OTP_TTL, max_attempts=OTP_MAX_ATTEMPTS, maxsize=OTP_STORE_MAX):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.maxsize = maxsize
+        self._codes = OrderedDict()  # email -> [code, expires_at, attempts]
+        self._lock = threading.Lock()
+
+    def issue(self, email):
+        code = new_code()
+        with self._lock:
+            self._codes[_key(email)] = [code, time.monotonic() + self.ttl, 0]
+            self._codes.move_to_end(_key(email))
+            while len(self._codes) > self.maxsize:
+                self._codes.popitem(last=False)
+        return code
+
+    def verify(self, email, code):
+        key = _key(email)
+        with self._lock:
+            entry = self._codes.get(key)
+            if entry is None:
+                return EXPIRED
+            if entry[1] <= time.monotonic():
+                del self._codes[key]
+                return EXPIRED
+            # Bytes: compare_digest refuses non-ASCII str, and a pasted
+            # "１２３４５６" must count as a wrong guess, not a server error
+            if hmac.compare_digest(entry[0].encode("utf-8"), str(code).encode("utf-8")):
+                del self._codes[key]
+                return VERIFIED
+            entry[2] += 1
+            if entry[2] >= self.max_attempts:
+                del self._codes[key]
+                return LOCKED
+            return INVALID
+
+    def __len__(self):
+        with self._lock:
+            return len(self._codes)
+
+
+# Check-and-update in one round-trip, atomically across processes
+_VERIFY_SCRIPT = """
+local code = redis.call('HGET', KEYS[1], 'code')
+if not code then return 0 end
+if code == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+if redis.call('HINCRBY', KEYS[1], 'attempts', 1) >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return 3
+end
+return 2
+"""
+_SCRIPT_RESULTS = {0: EXPIRED, 1: VERIFIED, 2: INVALID, 3: LOCKED}
+
+
+class RedisOtpStore:
+    def __init__(self, url=cache.CACHE_REDIS_URL, ttl=OTP_TTL, max_attempts=OTP_MAX_ATTEMPTS):
+        import redis
+
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self._client = redis.Redis.from_url(url)
+        self._verify = self._client.register_script(_VERIFY_SCRIPT)
+
+    def _redis_key(self, email):
+        return f"anxisense:otp:{_key(email)}"
+
+    def issue(self, email):
+        code = new_code()
+        key = self._redis_key(email)
+        pipe = self._client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"code": code, "attempts": 0})
+        pipe.pexpire(key, max(1, int(1000 * self.ttl)))
+        pipe.execute()
+        return code
+
+    def verify(self, email, code):
+        result = self._verify(keys=[self._redis_key(email)], args=[str(code), self.max_attempts])
+        return _SCRIPT_RESULTS[int(result)]
+
+
+def make_store():
+    if OTP_BACKEND == "redis":
+        return RedisOtpStore()
+    return MemoryOtpStore()
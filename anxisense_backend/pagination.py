@@ -0,0 +1,92 @@
+import base64
+from datetime import datetime
+
+from flask import Response, stream_with_context
+
+import serialization
+
+# ----------------------------
+# Keyset pagination + streamed JSON lists
+# ----------------------------
+# Pages are addressed by an opaque cursor that encodes the sort key of the
+# last row sent (e.g. "2024-05-01 10:00:00|123"), so each page is an index
+# range scan instead of an OFFSET. Rows are streamed to the client as they
+# come off an unbuffered server-side cursor, so a large list is never built
+# in memory.
+
+MAX_PAGE_SIZE = 500
+STREAM_CHUNK_SIZE = 200
+TIMESTAMP_FORMAT = serialization.TIMESTAMP_FORMAT
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def encode_cursor(*parts):
+    raw = "|".join(str(p) for p in parts)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, *types):
+    # decode_cursor(token, datetime, int) -> (datetime, int)
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+        if len(parts) != len(types):
+            raise ValueError("wrong number of parts")
+        return tuple(
+            datetime.strptime(p, TIMESTAMP_FORMAT) if t is datetime else t(p)
+            for p, t in zip(parts, types)
+        )
+    except Exception:
+        raise InvalidPageRequest("Invalid cursor")
+
+
+def parse_limit(value, default=None):
+    if value is None or value == "":
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidPageRequest("Invalid limit format")
+    if limit < 1:
+        raise InvalidPageRequest("limit must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def stream_rows(db, cursor, limit, cursor_key, transform=None):
+    # Streams {"success": true, "data": [...], "next_cursor": ...} from a
+    # query executed on a plain (tuple) cursor. The query should fetch
+    # limit + 1 rows: the extra row only signals that another page exists.
+    # Each fetched chunk is encoded in one call (see serialization.py);
+    # transform, if given, reshapes each row dict before it is encoded and
+    # cursor_key gets the last row sent as a dict. db and cursor are
+    # released when the stream finishes or the client goes away.
+    columns = serialization.column_names(cursor)
+
+    def generate():
+        try:
+            yield '{"success": true, "data": ['
+            sent = 0
+            last = None
+            next_cursor = None
+            while next_cursor is None:
+                rows = cursor.fetchmany(STREAM_CHUNK_SIZE)
+                if not rows:
+                    break
+                more = limit is not None and sent + len(rows) > limit
+                if more:
+                    rows = rows[:limit - sent]
+                if rows:
+                    yield ("," if sent else "") + serialization.encode_rows(columns, rows, transform)
+                    sent += len(rows)
+                    last = rows[-1]
+                if more:
+                    next_cursor = cursor_key(dict(zip(columns, last)))
+            yield '], "next_cursor": ' + serialization.dumps(next_cursor) + '}'
+        finally:
+            cursor.close()
+            db.close()
+
+    return Response(stream_with_context(generate()), status=200, mimetype="application/json")
@@ -0,0 +1,77 @@
+import os
+import time
+
+from flask import g, request
+
+import logs
+import metrics
+
+# ----------------------------
+# Per-endpoint request metrics
+# ----------------------------
+# install(app) times every request by route template (so /api/doctor/<int:
+# doctor_id>/avatar is one series, not one per doctor) and counts
+# responses by status. Timing stops at teardown, which for the streamed
+# patient/assessment lists is after the last row was sent. Requests slower
+# than SLOW_REQUEST_SECONDS are logged with the time spent in each internal
+# phase (see metrics.phase); everything else is logged at DEBUG.
+#
+#   SLOW_REQUEST_SECONDS  default 1.0
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_seconds", "Request latency by endpoint", labelnames=["method", "endpoint"])
+RESPONSES = metrics.counter(
+    "http_responses_total", "Responses by endpoint and status", ["method", "endpoint", "status"])
+IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Requests currently being served", ["endpoint"])
+
+log = logs.get_logger("requests")
+
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _before():
+    g.request_start = time.perf_counter()
+    IN_FLIGHT.inc(endpoint=_endpoint())
+    metrics.start_phases()
+
+
+def _after(response):
+    g.response_status = response.status_code
+    return response
+
+
+def _teardown(error):
+    start = g.pop("request_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    endpoint = _endpoint()
+    status = g.pop("response_status", 500)
+
+    IN_FLIGHT.dec(endpoint=endpoint)
+    REQUEST_SECONDS.observe(elapsed, method=request.method, endpoint=endpoint)
+    RESPONSES.inc(method=request.method, endpoint=endpoint, status=status)
+
+    phases = {name: round(seconds * 1000, 1) for name, seconds in metrics.stop_phases().items()}
+    fields = {
+        "method": request.method,
+        "endpoint": endpoint,
+        "status": status,
+        "duration_ms": round(elapsed * 1000, 1),
+        "phases_ms": phases
+    }
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        log.warning("slow request", extra=fields)
+    else:
+        log.debug("request", extra=fields)
+
+
+def install(app):
+    app.before_request(_before)
+    app.after_request(_after)
+    app.teardown_request(_teardown)
@@ -0,0 +1,161 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import emotion_store
+import scoring
+
+# ----------------------------
+# Re-score historical assessments
+# ----------------------------
+# Recomputes anxiety_score / anxiety_level for the whole assessments table
+# under a scoring profile (see scoring.py), in keyset-paged chunks. Each
+# chunk is scored in one vectorized call and only rows whose result
+# changed are written back: they are bulk-inserted into a temporary table
+# and applied with a single UPDATE ... JOIN, then committed.
+#
+# Rows with a stored emotion vector (see emotion_store.py) get a fresh
+# score from the profile's weights; older rows without one can only have
+# their stored score re-bucketed with the profile's thresholds.
+#
+#   python rescore.py --profile v2 --dry-run
+#   python rescore.py --profile v2
+
+CHUNK_SIZE = 50000
+
+
+def fetch_chunk(cursor, after_id, chunk_size):
+    cursor.execute("""
+        SELECT id, anxiety_score, anxiety_level, emotion_vector
+        FROM assessments
+        WHERE id > %s
+        ORDER BY id
+        LIMIT %s
+    """, (after_id, chunk_size))
+    return cursor.fetchall()
+
+
+def score_chunk(rows, profile):
+    # -> (ids, scores, levels) of the rows whose result changes
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    scores = np.array([r[1] for r in rows], dtype=np.float64)
+    old_scores = scores.copy()
+    old_levels = np.array([r[2] for r in rows], dtype=object)
+
+    # Rows without a vector only have the rounded score, i.e. a raw score
+    # within +-0.005 of it; keep the stored level if any raw score in that
+    # range gives it, so an unchanged profile never rewrites boundary rows
+    levels = scoring.levels_for(scores, profile)
+    lower = scoring.levels_for(scores - 0.005, profile)
+    upper = scoring.levels_for(np.nextafter(scores + 0.005, -np.inf), profile)
+    consistent = (old_levels == lower) | (old_levels == upper)
+    levels[consistent] = old_levels[consistent]
+
+    # Like the API: bucket the raw weighted sum, round only for storage
+    vectors = emotion_store.to_matrix(r[3] for r in rows)
+    has_vector = ~np.isnan(vectors).any(axis=1)
+    if has_vector.any():
+        scores[has_vector], levels[has_vector] = scoring.score_matrix(vectors[has_vector], profile)
+    # FLOAT column: compare at the precision scores are rounded to
+    changed = (levels != old_levels) | (np.abs(scores - old_scores) >= 0.005)
+    return ids[changed], scores[changed], levels[changed]
+
+
+def apply_changes(cursor, ids, scores, levels):
+    cursor.execute("TRUNCATE TABLE rescore_tmp")
+    cursor.executemany(
+        "INSERT INTO rescore_tmp (id, anxiety_score, anxiety_level) VALUES (%s, %s, %s)",
+        [(int(i), float(s), str(l)) for i, s, l in zip(ids, scores, levels)]
+    )
+    cursor.execute("""
+        UPDATE assessments a
+        JOIN rescore_tmp t ON t.id = a.id
+        SET a.anxiety_score = t.anxiety_score,
+            a.anxiety_level = t.anxiety_level
+    """)
+
+
+def refresh_latest(cursor):
+    # Keep the denormalized latest_* columns on patients in step
+    cursor.execute("""
+        UPDATE patients p
+        JOIN assessments a ON a.id = p.latest_assessment_id
+        SET p.latest_anxiety_score = a.anxiety_score,
+            p.latest_anxiety_level = a.anxiety_level
+        WHERE p.latest_anxiety_score <> a.anxiety_score
+           OR p.latest_anxiety_level <> a.anxiety_level
+    """)
+
+
+def rescore(db, profile, chunk_size=CHUNK_SIZE, dry_run=False):
+    cursor = db.cursor()
+    summary = {"rows": 0, "changed": 0, "by_level": {}}
+    try:
+        if not dry_run:
+            cursor.execute("""
+                CREATE TEMPORARY TABLE IF NOT EXISTS rescore_tmp (
+                    id INT PRIMARY KEY,
+                    anxiety_score FLOAT NOT NULL,
+                    anxiety_level VARCHAR(50) NOT NULL
+                )
+            """)
+
+        after_id = 0
+        while True:
+            rows = fetch_chunk(cursor, after_id, chunk_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            summary["rows"] += len(rows)
+
+            ids, scores, levels = score_chunk(rows, profile)
+            summary["changed"] += len(ids)
+            for name, count in zip(*np.unique(levels.astype(str), return_counts=True)):
+                summary["by_level"][name] = summary["by_level"].get(name, 0) + int(count)
+
+            if len(ids) and not dry_run:
+                apply_changes(cursor, ids, scores, levels)
+                db.commit()
+            print(f"  ...{summary['rows']} rows scanned, {summary['changed']} changed", flush=True)
+
+        if not dry_run and summary["changed"]:
+            refresh_latest(cursor)
+            db.commit()
+    finally:
+        cursor.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored assessments under a scoring profile")
+    parser.add_argument("--profile", default=scoring.SCORING_PROFILE)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    try:
+        profile = scoring.get_profile(args.profile)
+    except scoring.UnknownProfile as e:
+        print(e.args[0])
+        return 1
+
+    import migrate  # needs MySQLdb; keeps score_chunk importable without it
+    db = migrate.get_connection()
+    try:
+        start = time.perf_counter()
+        summary = rescore(db, profile, args.chunk_size, args.dry_run)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+
+    verb = "would change" if args.dry_run else "changed"
+    print(f"Profile {profile.name}: {summary['rows']} rows scanned, {summary['changed']} {verb} in {elapsed:.1f}s")
+    for name, count in sorted(summary["by_level"].items()):
+        print(f"  -> {name}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
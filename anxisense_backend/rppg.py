@@ -0,0 +1,205 @@
+import math
+import os
+
+import numpy as np
+
+# ----------------------------
+# rPPG heart-rate estimation
+# ----------------------------
+# Estimates pulse rate and a short-window HRV figure from the colour of the
+# skin over time. Input is a per-frame channel-mean series: green means
+# (shape (n,)) or RGB means (shape (n, 3), combined with the POS method).
+# Several scans can be processed in one call by stacking series of equal
+# length along the first axis; every step is vectorized NumPy.
+#
+# Pipeline: linear detrend -> normalize -> FFT band-pass (MIN_BPM..MAX_BPM)
+# -> Welch PSD peak (parabolic refinement) for BPM -> peak intervals on the
+# filtered signal, upsampled to HRV_SAMPLE_HZ, for RMSSD. When the peak
+# does not stand out from the rest of the band (SNR below RPPG_MIN_SNR_DB)
+# there is no pulse to report and bpm / hrv_rmssd_ms are None.
+
+MIN_BPM = float(os.getenv("RPPG_MIN_BPM", "42"))
+MAX_BPM = float(os.getenv("RPPG_MAX_BPM", "180"))
+# Band noise alone peaks around -2 dB; a clean pulse scores about 5 dB
+MIN_SNR_DB = float(os.getenv("RPPG_MIN_SNR_DB", "2"))
+MIN_SECONDS = 4.0
+HRV_SAMPLE_HZ = 100.0
+NFFT = 2048
+
+
+class InvalidSignal(ValueError):
+    pass
+
+
+def resample(values, timestamps, fps):
+    # Irregularly sampled series (e.g. browser setInterval jitter) onto a
+    # uniform fps grid; timestamps in seconds
+    values = np.asarray(values, dtype=np.float64)
+    try:
+        t = np.asarray(timestamps, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise InvalidSignal("timestamps must be numbers")
+    if t.ndim != 1 or len(t) < 2:
+        raise InvalidSignal("timestamps must be a list of at least two times")
+    if len(t) != len(values):
+        raise InvalidSignal("timestamps and signal must have the same length")
+    grid = np.arange(t[0], t[-1], 1.0 / fps)
+    if values.ndim == 1:
+        return np.interp(grid, t, values)
+    return np.stack([np.interp(grid, t, values[:, c]) for c in range(values.shape[1])], axis=1)
+
+
+def pos(rgb, fps):
+    # Plane-Orthogonal-to-Skin (Wang et al. 2017): (..., n, 3) -> (..., n)
+    rgb = np.asarray(rgb, dtype=np.float64)
+    n = rgb.shape[-2]
+    win = max(2, int(round(1.6 * fps)))
+    if win >= n:
+        win = n
+
+    windows = np.lib.stride_tricks.sliding_window_view(rgb, win, axis=-2)  # (..., n-win+1, 3, win)
+    normed = windows / (windows.mean(axis=-1, keepdims=True) + 1e-9)
+    s1 = normed[..., 1, :] - normed[..., 2, :]
+    s2 = normed[..., 1, :] + normed[..., 2, :] - 2 * normed[..., 0, :]
+    alpha = s1.std(axis=-1, keepdims=True) / (s2.std(axis=-1, keepdims=True) + 1e-9)
+    h = s1 + alpha * s2
+    h = h - h.mean(axis=-1, keepdims=True)
+
+    # Overlap-add the window outputs back onto the timeline
+    out = np.zeros(rgb.shape[:-2] + (n,))
+    for offset in range(win):
+        out[..., offset:offset + h.shape[-2]] += h[..., :, offset]
+    return out
+
+
+def detrend(x):
+    # Remove a least-squares line per series and scale to unit variance
+    n = x.shape[-1]
+    t = np.arange(n, dtype=np.float64)
+    t_c = t - t.mean()
+    slope = (x * t_c).sum(axis=-1, keepdims=True) / (t_c ** 2).sum()
+    x = x - x.mean(axis=-1, keepdims=True) - slope * t_c
+    return x / (x.std(axis=-1, keepdims=True) + 1e-9)
+
+
+def bandpass(x, fps, low_hz, high_hz):
+    spectrum = np.fft.rfft(x, axis=-1)
+    freqs = np.fft.rfftfreq(x.shape[-1], d=1.0 / fps)
+    spectrum[..., (freqs < low_hz) | (freqs > high_hz)] = 0
+    return np.fft.irfft(spectrum, n=x.shape[-1], axis=-1)
+
+
+def welch(x, fps, nfft=NFFT):
+    # Welch PSD with Hann windows and 50% overlap, vectorized over series
+    n = x.shape[-1]
+    nperseg = min(n, int(round(8 * fps)))
+    step = max(1, nperseg // 2)
+    segments = np.lib.stride_tricks.sliding_window_view(x, nperseg, axis=-1)[..., ::step, :]
+    window = np.hanning(nperseg)
+    segments = (segments - segments.mean(axis=-1, keepdims=True)) * window
+    power = np.abs(np.fft.rfft(segments, n=nfft, axis=-1)) ** 2
+    psd = power.mean(axis=-2) / (fps * (window ** 2).sum())
+    return np.fft.rfftfreq(nfft, d=1.0 / fps), psd
+
+
+def _rmssd_ms(filtered, fps, max_bpm):
+    # Local maxima at least one max-rate beat apart -> inter-beat intervals.
+    # At webcam rates one sample is 30-100 ms, which would swamp a typical
+    # 20-50 ms RMSSD, so the (band-limited) signal is upsampled to
+    # HRV_SAMPLE_HZ and each peak refined by parabolic interpolation.
+    up = max(1, int(math.ceil(HRV_SAMPLE_HZ / fps)))
+    x = np.fft.irfft(np.fft.rfft(filtered), n=len(filtered) * up) * up
+    rate = fps * up
+
+    min_gap = max(1, int(rate * 60.0 / max_bpm))
+    is_peak = (x[1:-1] > x[:-2]) & (x[1:-1] >= x[2:]) & (x[1:-1] > 0)
+    candidates = np.flatnonzero(is_peak) + 1
+
+    peaks = []
+    for idx in candidates:
+        if peaks and idx - peaks[-1] < min_gap:
+            if x[idx] > x[peaks[-1]]:
+                peaks[-1] = idx
+            continue
+        peaks.append(idx)
+
+    # The FFT filters wrap around, so the first and last beat are unreliable
+    peaks = np.asarray(peaks[1:-1])
+    if len(peaks) < 4:
+        return None
+    left, mid, right = x[peaks - 1], x[peaks], x[peaks + 1]
+    denom = left - 2 * mid + right
+    times = peaks + np.where(denom != 0, 0.5 * (left - right) / np.where(denom != 0, denom, 1), 0.0)
+    ibi_ms = np.diff(times) * 1000.0 / rate
+    return float(np.sqrt(np.mean(np.diff(ibi_ms) ** 2)))
+
+
+def estimate(signal, fps, timestamps=None):
+    # signal: (n,) green means, (n, 3) RGB means, or a stack of either with
+    # a leading scans axis. Returns one dict, or a list for stacked input.
+    try:
+        x = np.asarray(signal, dtype=np.float64)
+        fps = float(fps)
+    except (TypeError, ValueError):
+        raise InvalidSignal("signal must be a numeric series and fps a number")
+    if x.ndim == 0 or x.size == 0:
+        raise InvalidSignal("signal must be a non-empty series")
+    if not math.isfinite(fps) or fps <= 0:
+        raise InvalidSignal("fps must be positive")
+    if timestamps is not None:
+        if x.ndim > 2:
+            raise InvalidSignal("timestamps are only supported for a single scan")
+        x = resample(x, timestamps, fps)
+
+    rgb = x.shape[-1] == 3 and x.ndim >= 2
+    n = x.shape[-2] if rgb else x.shape[-1]
+    if n < MIN_SECONDS * fps:
+        raise InvalidSignal(f"Need at least {MIN_SECONDS:.0f}s of signal")
+    if 2 * MAX_BPM / 60.0 > fps:
+        raise InvalidSignal(f"fps must be at least {2 * MAX_BPM / 60.0:.0f} to resolve {MAX_BPM:.0f} bpm")
+
+    single = x.ndim == (2 if rgb else 1)
+    pulse = pos(x, fps) if rgb else x
+    if single:
+        pulse = pulse[np.newaxis]
+
+    low, high = MIN_BPM / 60.0, MAX_BPM / 60.0
+    filtered = bandpass(detrend(pulse), fps, low, high)
+    freqs, psd = welch(filtered, fps)
+
+    band = (freqs >= low) & (freqs <= high)
+    band_idx = np.flatnonzero(band)
+    peak = band_idx[np.argmax(psd[:, band], axis=-1)]
+
+    # Parabolic interpolation around the peak bin for sub-bin precision
+    rows = np.arange(psd.shape[0])
+    left = psd[rows, np.maximum(peak - 1, 0)]
+    mid = psd[rows, peak]
+    right = psd[rows, np.minimum(peak + 1, psd.shape[1] - 1)]
+    denom = left - 2 * mid + right
+    shift = np.where(denom != 0, 0.5 * (left - right) / np.where(denom != 0, denom, 1), 0.0)
+    peak_hz = freqs[peak] + shift * (freqs[1] - freqs[0])
+
+    # Signal-to-noise: power near the peak (and its first harmonic) vs the rest of the band
+    near = (np.abs(freqs[np.newaxis, :] - peak_hz[:, np.newaxis]) <= 0.1) | \
+           (np.abs(freqs[np.newaxis, :] - 2 * peak_hz[:, np.newaxis]) <= 0.1)
+    in_band = psd * band
+    signal_power = (in_band * near).sum(axis=-1)
+    noise_power = (in_band * ~near).sum(axis=-1)
+    snr_db = 10 * np.log10((signal_power + 1e-12) / (noise_power + 1e-12))
+
+    results = [
+        {
+            "bpm": round(float(hz * 60.0), 1),
+            "hrv_rmssd_ms": _round_or_none(_rmssd_ms(f, fps, MAX_BPM)),
+            "snr_db": round(float(snr), 2)
+        }
+        if snr >= MIN_SNR_DB else
+        {"bpm": None, "hrv_rmssd_ms": None, "snr_db": round(float(snr), 2)}
+        for hz, f, snr in zip(peak_hz, filtered, snr_db)
+    ]
+    return results[0] if single else results
+
+
+def _round_or_none(value, digits=1):
+    return None if value is None else round(value, digits)
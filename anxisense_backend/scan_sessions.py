@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+import uuid
+
+import metrics
+from cache import TTLCache
+
+# ----------------------------
+# Streaming scan sessions
+# ----------------------------
+# Backs /api/scan-sessions. The browser opens a session when the scan
+# starts, posts each downscaled frame as soon as it is captured and closes
+# the session when the scan window ends. Every frame is analysed when it
+# arrives, so inference overlaps with capture and the final result only
+# has to aggregate what is already there.
+#
+# Sessions live in process memory (frames are scored by this process's
+# model), expire SCAN_SESSION_TTL seconds after they are opened and are
+# capped at SCAN_SESSION_MAX open sessions (oldest dropped first).
+
+SCAN_SESSION_TTL = float(os.getenv("SCAN_SESSION_TTL", "120"))
+SCAN_SESSION_MAX = int(os.getenv("SCAN_SESSION_MAX", "256"))
+SCAN_SESSION_MAX_FRAMES = int(os.getenv("SCAN_SESSION_MAX_FRAMES", "64"))
+
+FRAMES = metrics.counter("scan_session_frames_total", "Frames analysed through streaming scan sessions")
+
+_sessions = TTLCache("scan_sessions", maxsize=SCAN_SESSION_MAX, ttl=SCAN_SESSION_TTL)
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class SessionFull(ValueError):
+    pass
+
+
+class ScanSession:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.started = time.monotonic()
+        self._frames = []  # per-frame result dicts, in arrival order
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def reserve(self, count):
+        # Claim room before running inference so a flood of frames can't
+        # burn CPU past the cap
+        with self._lock:
+            if len(self._frames) + count > SCAN_SESSION_MAX_FRAMES:
+                raise SessionFull(f"At most {SCAN_SESSION_MAX_FRAMES} frames per session")
+            self._frames.extend([None] * count)
+            return len(self._frames) - count
+
+    def fill(self, slot, frames):
+        with self._lock:
+            self._frames[slot:slot + len(frames)] = frames
+        FRAMES.inc(len(frames))
+
+    def release(self, slot, count):
+        # Inference failed for a reserved slot; leave it empty
+        with self._lock:
+            for i in range(slot, slot + count):
+                self._frames[i] = None
+
+    def frames(self):
+        # Completed frames in capture order (uploads can finish out of order)
+        with self._lock:
+            done = [f for f in self._frames if f is not None]
+        return sorted(done, key=lambda f: f["timestamp"])
+
+
+def create():
+    session = ScanSession()
+    _sessions.set(session.id, session)
+    return session
+
+
+def get(session_id):
+    session = _sessions.get(session_id)
+    if session is None:
+        raise SessionNotFound(session_id)
+    return session
+
+
+def close(session_id):
+    session = get(session_id)
+    _sessions.delete(session_id)
+    return session
@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+
+# ----------------------------
+# Anxiety scoring
+# ----------------------------
+# Anxiety score = weighted sum of the emotion percentages, bucketed into
+# levels by thresholds. Weights and thresholds come from a named, versioned
+# profile so historical data can be re-scored under a new profile and the
+# result compared against the old one (see rescore.py).
+#
+# score_matrix() scores an (N, 7) matrix in one vectorized call; score()
+# is the single-dict form used by the API.
+#
+#   SCORING_PROFILE        active profile name (default "v1")
+#   SCORING_PROFILES_FILE  JSON file with extra profiles, e.g.
+#                          {"v2": {"weights": {"fear": 0.45, "sad": 0.35, "surprise": 0.2},
+#                                  "thresholds": [25, 55]}}
+
+# Same order as model_manager.EMOTION_LABELS (DeepFace's output order)
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+LEVELS = ["Low", "Moderate", "High"]
+
+PROFILES = {
+    "v1": {"weights": {"fear": 0.5, "sad": 0.3, "surprise": 0.2}, "thresholds": [30, 60]}
+}
+
+SCORING_PROFILE = os.getenv("SCORING_PROFILE", "v1")
+SCORING_PROFILES_FILE = os.getenv("SCORING_PROFILES_FILE")
+
+
+class UnknownProfile(KeyError):
+    pass
+
+
+class Profile:
+    def __init__(self, name, weights, thresholds, levels=LEVELS):
+        unknown = set(weights) - set(EMOTION_LABELS)
+        if unknown:
+            raise ValueError(f"Profile {name}: unknown emotions {sorted(unknown)}")
+        if len(thresholds) != len(levels) - 1 or list(thresholds) != sorted(thresholds):
+            raise ValueError(f"Profile {name}: need {len(levels) - 1} ascending thresholds")
+
+        self.name = name
+        self.weights = np.array([float(weights.get(label, 0)) for label in EMOTION_LABELS])
+        self.thresholds = np.array(thresholds, dtype=np.float64)
+        self.levels = np.array(levels, dtype=object)
+
+
+def load_profiles(path=SCORING_PROFILES_FILE):
+    specs = dict(PROFILES)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            specs.update(json.load(f))
+    return {
+        name: Profile(name, spec["weights"], spec["thresholds"], spec.get("levels", LEVELS))
+        for name, spec in specs.items()
+    }
+
+
+_profiles = load_profiles()
+
+
+def get_profile(name=None):
+    name = name or SCORING_PROFILE
+    try:
+        return _profiles[name]
+    except KeyError:
+        raise UnknownProfile(f"Unknown scoring profile '{name}' (have: {', '.join(sorted(_profiles))})")
+
+
+def levels_for(scores, profile=None):
+    # A score equal to a threshold falls in the higher level (30 -> Moderate)
+    profile = profile or get_profile()
+    return profile.levels[np.searchsorted(profile.thresholds, scores, side="right")]
+
+
+def score_matrix(emotions, profile=None):
+    # (N, 7) percentages in EMOTION_LABELS order -> (scores, levels)
+    profile = profile or get_profile()
+    emotions = np.asarray(emotions, dtype=np.float64)
+    raw = emotions @ profile.weights
+    return np.round(raw, 2), levels_for(raw, profile)
+
+
+def to_matrix(emotion_dicts):
+    return np.array([[float(e.get(label, 0)) for label in EMOTION_LABELS] for e in emotion_dicts])
+
+
+def score(emotions, profile=None):
+    # {"fear": 12.3, ...} -> (score, level)
+    scores, levels = score_matrix(to_matrix([emotions]), profile)
+    return float(scores[0]), str(levels[0])
+
+
+def level(anxiety_score, profile=None):
+    return str(levels_for(np.asarray([anxiety_score]), profile)[0])
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import image_io
+
+# ----------------------------
+# Face detector benchmark
+# ----------------------------
+# Runs each DeepFace detector backend over a directory of local images and
+# reports latency (p50/p95), peak memory and detection rate, so a
+# deployment can pick FACE_DETECTOR_BACKEND from data rather than guesswork.
+#
+#   python scripts/benchmark_detectors.py path/to/images
+#   python scripts/benchmark_detectors.py path/to/images --backends opencv,mtcnn --json results.json
+#
+# Images go through the same decoder as /api/analyze (image_io.decode_image).
+# Every backend runs in its own fresh process so model loads and peak
+# memory don't bleed into each other.
+
+DEFAULT_BACKENDS = ["opencv", "ssd", "mtcnn", "retinaface", "yunet"]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def list_images(folder):
+    paths = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return paths
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_backend(backend, paths, min_confidence):
+    from deepface import DeepFace
+
+    result = {"backend": backend}
+    try:
+        start = time.perf_counter()
+        DeepFace.build_model(task="face_detector", model_name=backend)
+        result["load_seconds"] = round(time.perf_counter() - start, 2)
+
+        images = []
+        for path in paths:
+            with open(path, "rb") as f:
+                try:
+                    images.append(image_io.decode_image(f.read()))
+                except image_io.InvalidImage:
+                    pass
+        if not images:
+            raise RuntimeError("No readable images")
+
+        # First call traces graphs / allocates buffers; keep it out of the timings
+        DeepFace.extract_faces(img_path=images[0], detector_backend=backend, enforce_detection=False, align=True)
+
+        latencies = []
+        detected = 0
+        for img in images:
+            start = time.perf_counter()
+            faces = DeepFace.extract_faces(img_path=img, detector_backend=backend, enforce_detection=False, align=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+            # With enforce_detection=False a miss comes back as the whole frame
+            # with confidence 0
+            if any(face.get("confidence", 0) > min_confidence for face in faces):
+                detected += 1
+
+        result.update({
+            "images": len(images),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+            "mean_ms": round(float(np.mean(latencies)), 1),
+            "detection_rate": round(detected / len(images), 3),
+            "peak_rss_mb": peak_rss_mb()
+        })
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def print_table(results):
+    header = f"{'backend':<12}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'detected':>10}{'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<12}  failed: {r['error']}")
+            continue
+        peak = "n/a" if r["peak_rss_mb"] is None else f"{r['peak_rss_mb']:.0f}"
+        print(
+            f"{r['backend']:<12}{r['load_seconds']:>8.2f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+            f"{r['detection_rate'] * 100:>9.1f}%{peak:>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DeepFace face detector backends on local images")
+    parser.add_argument("images", help="Directory of test images (searched recursively)")
+    parser.add_argument("--backends", default=",".join(DEFAULT_BACKENDS), help="Comma-separated detector names")
+    parser.add_argument("--min-confidence", type=float, default=0.0, help="Confidence above which a face counts as detected")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    paths = list_images(args.images)
+    if not paths:
+        print(f"No images found under {args.images}")
+        return 1
+    print(f"Benchmarking on {len(paths)} images\n")
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                results.append(pool.submit(run_backend, backend, paths, args.min_confidence).result())
+        except Exception as e:
+            # e.g. the backend's native library crashed the process
+            results.append({"backend": backend, "error": str(e)})
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
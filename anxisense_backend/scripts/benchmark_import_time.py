@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# ----------------------------
+# Import-time benchmark
+# ----------------------------
+# Measures how long a cold interpreter takes to import each target and
+# whether TensorFlow got pulled in on the way. Every sample runs in a fresh
+# subprocess, so nothing is cached between runs except the OS file cache.
+#
+#   python scripts/benchmark_import_time.py
+#   python scripts/benchmark_import_time.py --runs 10 app model_manager
+#
+# Importing app also runs its startup hook (migrations + model loading), so
+# it is measured with INFERENCE_ENABLED=false (a CRUD-only instance) unless
+# --with-inference is given; a missing database only costs the failed
+# connect attempt.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGETS = ["app", "model_manager", "deepface"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - start
+print("RESULT", elapsed, "tensorflow" in sys.modules)
+"""
+
+
+def measure(target, env):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(target=target)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    for line in out.stdout.splitlines():
+        if line.startswith("RESULT "):
+            _, seconds, tf_loaded = line.split()
+            return float(seconds), tf_loaded == "True"
+    raise RuntimeError((out.stderr or out.stdout).strip().splitlines()[-1] if (out.stderr or out.stdout) else "no output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import time of backend modules")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--with-inference", action="store_true", help="Import app with INFERENCE_ENABLED=true")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["INFERENCE_ENABLED"] = "true" if args.with_inference else "false"
+
+    results = []
+    print(f"{'module':<16}{'median s':>10}{'min s':>9}{'max s':>9}  tensorflow")
+    for target in args.targets:
+        try:
+            samples = [measure(target, env) for _ in range(args.runs)]
+        except Exception as e:
+            print(f"{target:<16}  failed: {e}")
+            results.append({"module": target, "error": str(e)})
+            continue
+        times = [s for s, _ in samples]
+        tf_loaded = any(tf for _, tf in samples)
+        results.append({
+            "module": target,
+            "median_seconds": round(statistics.median(times), 3),
+            "min_seconds": round(min(times), 3),
+            "max_seconds": round(max(times), 3),
+            "tensorflow_imported": tf_loaded
+        })
+        print(f"{target:<16}{statistics.median(times):>10.3f}{min(times):>9.3f}{max(times):>9.3f}  {'yes' if tf_loaded else 'no'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
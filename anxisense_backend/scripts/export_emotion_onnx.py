@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import emotion_onnx
+
+# ----------------------------
+# Emotion model export
+# ----------------------------
+# Exports DeepFace's Keras emotion CNN to ONNX and quantizes it to int8 for
+# EMOTION_RUNTIME=onnx. Run once per DeepFace version, from the backend
+# folder, with requirements.txt and requirements-onnx.txt installed:
+#
+#   python scripts/export_emotion_onnx.py
+#   python scripts/export_emotion_onnx.py --calibration-dir path/to/face/photos
+#
+# Without --calibration-dir the weights are quantized dynamically. With it,
+# faces are cropped from the photos exactly as /api/analyze does and used
+# to calibrate static (QDQ) int8 quantization, which is usually closer to
+# the float model. Check the result with test_emotion_onnx_parity.py.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def export_float(model, path):
+    # Keras 3 exports directly (via tf2onnx); older stacks go through tf2onnx
+    try:
+        model.export(path, format="onnx")
+        return
+    except (TypeError, ValueError, AttributeError) as e:
+        print(f"Keras ONNX export unavailable ({e}), falling back to tf2onnx")
+
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None, 48, 48, 1), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=17, output_path=path)
+
+
+def calibration_faces(folder, limit):
+    import image_io
+    import model_manager
+
+    faces = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            with open(os.path.join(root, name), "rb") as f:
+                try:
+                    img = image_io.decode_image(f.read())
+                except image_io.InvalidImage:
+                    continue
+            face, _ = model_manager.extract_face(img)
+            faces.append(face[np.newaxis, :, :, np.newaxis].astype(np.float32))
+            if len(faces) >= limit:
+                return faces
+    return faces
+
+
+def quantize(float_path, out_path, faces):
+    from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_dynamic, quantize_static
+
+    if not faces:
+        quantize_dynamic(float_path, out_path, weight_type=QuantType.QInt8)
+        return "dynamic"
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(float_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class Faces(CalibrationDataReader):
+        def __init__(self):
+            self._it = iter(faces)
+
+        def get_next(self):
+            face = next(self._it, None)
+            return None if face is None else {input_name: face}
+
+    quantize_static(float_path, out_path, Faces(), activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    return f"static, {len(faces)} calibration faces"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the emotion model to int8 ONNX")
+    parser.add_argument("--output", default=emotion_onnx.EMOTION_ONNX_PATH)
+    parser.add_argument("--calibration-dir", help="Photos with faces for static quantization")
+    parser.add_argument("--calibration-limit", type=int, default=300)
+    args = parser.parse_args()
+
+    from deepface import DeepFace
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    float_path = os.path.splitext(args.output)[0] + "_fp32.onnx"
+
+    model = DeepFace.build_model(task="facial_attribute", model_name="Emotion").model
+    export_float(model, float_path)
+    print(f"Float model: {float_path} ({os.path.getsize(float_path) / 1e6:.2f} MB)")
+
+    faces = []
+    if args.calibration_dir:
+        faces = calibration_faces(args.calibration_dir, args.calibration_limit)
+        if not faces:
+            print("No usable calibration faces found, using dynamic quantization")
+
+    mode = quantize(float_path, args.output, faces)
+    print(f"Int8 model ({mode}): {args.output} ({os.path.getsize(args.output) / 1e6:.2f} MB)")
+
+    # Quick sanity check on the exported model
+    sample = np.random.default_rng(0).random((8, 48, 48, 1), dtype=np.float32)
+    reference = np.asarray(model.predict_on_batch(sample))
+    quantized = emotion_onnx.OnnxEmotionModel(args.output).predict_on_batch(sample)
+    print(f"Max |difference| on random input: {np.abs(reference - quantized).max():.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
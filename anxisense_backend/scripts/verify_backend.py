@@ -63,7 +63,7 @@ def verify_backend():
                 log(f, "  [SUCCESS] 'otp' column exists in 'doctors' table.")
             else:
                 log(f, "  [ERROR] 'otp' column MISSING in 'doctors' table.")
-                log(f, "  Run 'create_doctors_table.sql' to update the schema.")
+                log(f, "  Run 'python migrate.py' to update the schema.")
                 return False
 
         except Exception as e:
@@ -0,0 +1,119 @@
+import math
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+import image_io
+
+# ----------------------------
+# Multi-frame scan input
+# ----------------------------
+# Backs POST /api/analyze/sequence. A scan arrives either as an ordered
+# list of JPEG frames ("frames" parts, captured at "fps") or as one short
+# clip ("video", e.g. WebM). Frames are decoded lazily and only the ones
+# kept by the sampling rate are decoded at all, so a long clip never sits
+# in memory as a full frame list.
+
+SEQUENCE_SAMPLE_FPS = float(os.getenv("SEQUENCE_SAMPLE_FPS", "2"))
+SEQUENCE_MAX_FRAMES = int(os.getenv("SEQUENCE_MAX_FRAMES", "32"))
+SEQUENCE_SMOOTHING_ALPHA = float(os.getenv("SEQUENCE_SMOOTHING_ALPHA", "0.4"))
+DEFAULT_FRAME_FPS = 10.0
+
+
+class InvalidSequence(ValueError):
+    pass
+
+
+def _step(source_fps, sample_fps):
+    if source_fps <= 0 or sample_fps <= 0:
+        return 1
+    return max(1, int(round(source_fps / sample_fps)))
+
+
+def iter_frame_files(files, fps=DEFAULT_FRAME_FPS, sample_fps=SEQUENCE_SAMPLE_FPS, max_frames=SEQUENCE_MAX_FRAMES):
+    # Yields (timestamp_seconds, bgr_image) for every step-th uploaded frame
+    step = _step(fps, sample_fps)
+    kept = 0
+    for i, file_storage in enumerate(files):
+        if i % step:
+            continue
+        yield i / fps, image_io.read_upload(file_storage)
+        kept += 1
+        if kept >= max_frames:
+            return
+
+
+def iter_video(file_storage, sample_fps=SEQUENCE_SAMPLE_FPS, max_frames=SEQUENCE_MAX_FRAMES):
+    # Container formats need a seekable file for OpenCV/FFmpeg, so the clip
+    # is spooled to a private temp file that is removed right after decoding
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file_storage.filename or "")[1] or ".webm")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            file_storage.save(f)
+
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise InvalidSequence("Could not read the uploaded video")
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 0
+            # WebM from MediaRecorder often reports no/odd fps; assume 30
+            if not 1 <= fps <= 240:
+                fps = 30.0
+            step = _step(fps, sample_fps)
+            kept = 0
+            i = 0
+            while kept < max_frames and cap.grab():
+                if i % step == 0:
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        yield i / fps, frame
+                        kept += 1
+                i += 1
+        finally:
+            cap.release()
+    finally:
+        os.remove(path)
+
+
+def read_sequence(req):
+    # Returns [(timestamp, image), ...] from a multipart request
+    files = req.files.getlist("frames")
+    if files:
+        try:
+            fps = float(req.form.get("fps", DEFAULT_FRAME_FPS))
+        except ValueError:
+            raise InvalidSequence("fps must be a number")
+        if not math.isfinite(fps) or fps <= 0:
+            raise InvalidSequence("fps must be a positive number")
+        frames = list(iter_frame_files(files, fps=fps))
+    elif "video" in req.files:
+        frames = list(iter_video(req.files["video"]))
+    else:
+        raise InvalidSequence("Upload 'frames' (one part per frame) or a 'video' clip")
+
+    if not frames:
+        raise InvalidSequence("No frames could be decoded")
+    return uniform_size(frames)
+
+
+def uniform_size(frames):
+    # Batched inference (and the worker pool's shared-memory handoff) needs
+    # one frame shape; frames from one camera session normally match already
+    h, w = frames[0][1].shape[:2]
+    return [
+        (t, img if img.shape[:2] == (h, w) else cv2.resize(img, (w, h)))
+        for t, img in frames
+    ]
+
+
+def ema(values, alpha=SEQUENCE_SMOOTHING_ALPHA):
+    # Exponential moving average along the first axis
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    acc = values[0]
+    for i, v in enumerate(values):
+        acc = alpha * v + (1 - alpha) * acc if i else v
+        out[i] = acc
+    return out
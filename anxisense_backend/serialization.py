@@ -0,0 +1,75 @@
+import base64
+import json
+from datetime import datetime, date
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ----------------------------
+# JSON encoding for API responses
+# ----------------------------
+# One encoder for jsonify() and the streamed row lists in pagination.py.
+# Database values are handled by the encoder's fallback hook instead of
+# rewriting every row first: datetimes become "%Y-%m-%d %H:%M:%S",
+# Decimals become floats and bytes become base64. Uses orjson when it is
+# installed (optional, much faster on large lists) and the standard
+# library otherwise.
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def default(value):
+    if isinstance(value, (datetime, date)):
+        return value.strftime(TIMESTAMP_FORMAT)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # PASSTHROUGH_DATETIME sends datetimes to default() so the format
+    # matches the stdlib path instead of orjson's ISO 8601
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=default, option=_OPTIONS).decode("utf-8")
+
+    loads = orjson.loads
+else:
+    _encoder = json.JSONEncoder(default=default, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(obj):
+        return _encoder.encode(obj)
+
+    loads = json.loads
+
+
+def column_names(cursor):
+    return [d[0] for d in cursor.description]
+
+
+def encode_rows(columns, rows, transform=None):
+    # Tuple rows + column names -> '{"a":1,...},{"a":2,...}' in one encoder
+    # call. transform, if given, reshapes each row dict first.
+    if not rows:
+        return ""
+    dicts = [dict(zip(columns, row)) for row in rows]
+    if transform is not None:
+        dicts = [transform(d) for d in dicts]
+    return dumps(dicts)[1:-1]
+
+
+class JSONResponses(JSONProvider):
+    # Installed with app.json = JSONResponses(app)
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
@@ -0,0 +1,48 @@
+import base64
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("AVATAR_DIR", tempfile.mkdtemp())
+
+import avatar_store
+
+
+def data_url(shape):
+    img = np.zeros(shape, dtype=np.uint8)
+    cv2.circle(img, (shape[1] // 2, shape[0] // 2), min(shape[:2]) // 3, (60, 120, 200), -1)
+    return "data:image/jpeg;base64," + base64.b64encode(cv2.imencode(".jpg", img)[1].tobytes()).decode()
+
+
+def test_save_writes_square_thumbnails():
+    url = data_url((960, 1280, 3))
+    ref = avatar_store.save_data_url(url)
+    assert avatar_store.is_ref(ref)
+    assert avatar_store.save_data_url(url) == ref  # content-addressed
+
+    for size in avatar_store.SIZES:
+        thumb = cv2.imread(avatar_store.path_for(ref, size))
+        assert thumb.shape == (size, size, 3)
+        assert os.path.getsize(avatar_store.path_for(ref, size)) < len(url)
+
+
+def test_pick_size_and_bad_input():
+    assert avatar_store.pick_size("40") == 64
+    assert avatar_store.pick_size("100") == 128
+    assert avatar_store.pick_size("1000") == 256
+    assert avatar_store.pick_size(None) == avatar_store.DEFAULT_SIZE
+    assert not avatar_store.is_ref("../../etc/passwd")
+
+    try:
+        avatar_store.save_data_url("data:text/plain;base64,aGk=")
+    except avatar_store.image_io.InvalidImage:
+        return
+    raise AssertionError("expected InvalidImage")
+
+
+if __name__ == "__main__":
+    test_save_writes_square_thumbnails()
+    test_pick_size_and_bad_input()
+    print("Avatar store OK")
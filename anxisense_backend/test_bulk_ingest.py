@@ -0,0 +1,86 @@
+import io
+import json
+
+import bulk_ingest
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+    def executemany(self, sql, rows):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.log.append("commit")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.log.append("close")
+
+
+def ndjson(rows):
+    return io.BytesIO(b"".join(json.dumps(row).encode("utf-8") + b"\n" for row in rows))
+
+
+def row(i):
+    return {"patient_id": i, "doctor_id": 1, "anxiety_score": 40, "anxiety_level": "Moderate"}
+
+
+def test_connection_held_per_chunk():
+    log = []
+
+    def connect():
+        log.append("acquire")
+        return FakeConnection(log)
+
+    records = bulk_ingest.iter_ndjson(ndjson([row(i) for i in range(5)]))
+    summary = bulk_ingest.ingest(connect, records, bulk_ingest.new_summary(), chunk_size=2)
+
+    assert summary["inserted"] == 5
+    assert log == ["acquire", "commit", "close"] * 3
+
+
+def test_no_connection_before_first_chunk():
+    def connect():
+        raise AssertionError("connection taken before any row was read")
+
+    records = bulk_ingest.iter_records(io.BytesIO(b"not json"), "application/json")
+    try:
+        bulk_ingest.ingest(connect, records, bulk_ingest.new_summary())
+    except bulk_ingest.InvalidBulkPayload:
+        return
+    raise AssertionError("expected InvalidBulkPayload")
+
+
+def test_oversized_ndjson_line_is_a_row_error():
+    huge = dict(row(1), note="x" * bulk_ingest.MAX_RECORD_BYTES)
+    stream = ndjson([row(0), huge, row(2)])
+    results = list(bulk_ingest.iter_ndjson(stream))
+
+    assert [index for index, _, _ in results] == [0, 1, 2]
+    assert results[0][1] == row(0) and results[2][1] == row(2)
+    assert results[1][1] is None and "exceeds" in results[1][2]
+
+
+if __name__ == "__main__":
+    test_connection_held_per_chunk()
+    test_no_connection_before_first_chunk()
+    test_oversized_ndjson_line_is_a_row_error()
+    print("Bulk ingest OK")
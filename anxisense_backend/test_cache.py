@@ -0,0 +1,41 @@
+import time
+
+from cache import TTLCache
+
+
+def test_lru_eviction_and_ttl():
+    c = TTLCache("test", maxsize=2, ttl=0.1)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # touch a so b is least recently used
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+
+    time.sleep(0.15)
+    assert c.get("a") is None
+    assert len(c) == 1  # expired "a" was dropped on lookup; "c" expires lazily
+
+
+def test_delete_invalidates():
+    c = TTLCache("test-delete", ttl=60)
+    c.set("1:2024-01-01", {"total": 5, "today": 1})
+    c.delete("1:2024-01-01")
+    assert c.get("1:2024-01-01") is None
+
+
+def test_bump_orphans_stale_values():
+    c = TTLCache("test-generation", ttl=60)
+    gen = c.generation("1")
+    counts = {"total": 5, "today": 1}  # read from the DB ...
+    c.bump("1")                        # ... while an assessment was saved
+    c.set(f"1:{gen}", counts)          # late write of the stale counts
+    assert c.generation("1") == gen + 1
+    assert c.get(f"1:{c.generation('1')}") is None
+
+
+if __name__ == "__main__":
+    test_lru_eviction_and_ttl()
+    test_delete_invalidates()
+    test_bump_orphans_stale_values()
+    print("Cache OK")
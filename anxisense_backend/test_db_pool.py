@@ -0,0 +1,86 @@
+import threading
+import time
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.pings = 0
+        self.rollbacks = 0
+
+    def ping(self):
+        self.pings += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_reuses_connections():
+    created = []
+
+    def connect():
+        created.append(FakeConnection())
+        return created[-1]
+
+    pool = ConnectionPool(connect, size=2, timeout=1)
+    for _ in range(5):
+        db = pool.acquire()
+        db.close()
+        db.close()  # second close is a no-op
+
+    assert len(created) == 1
+    assert created[0].rollbacks == 5
+    assert not created[0].closed
+
+
+def test_bounded_and_times_out():
+    pool = ConnectionPool(FakeConnection, size=2, timeout=0.2)
+    a = pool.acquire()
+    b = pool.acquire()
+    try:
+        pool.acquire()
+    except PoolTimeout:
+        pass
+    else:
+        raise AssertionError("expected PoolTimeout with every connection checked out")
+
+    # A waiting thread gets the connection as soon as one is returned
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    time.sleep(0.05)
+    a.close()
+    t.join()
+    assert got
+    b.close()
+    got[0].close()
+
+
+def test_pings_and_recycles_idle_connections():
+    created = []
+
+    def connect():
+        created.append(FakeConnection())
+        return created[-1]
+
+    pool = ConnectionPool(connect, size=1, ping_after=0.0, idle_timeout=0.1)
+    pool.acquire().close()
+    pool.acquire().close()
+    assert created[0].pings == 1
+
+    time.sleep(0.15)
+    pool.acquire().close()
+    assert created[0].closed
+    assert len(created) == 2
+
+
+if __name__ == "__main__":
+    test_reuses_connections()
+    test_bounded_and_times_out()
+    test_pings_and_recycles_idle_connections()
+    print("DB pool OK")
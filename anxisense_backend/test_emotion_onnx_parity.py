@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import emotion_onnx
+import image_io
+import model_manager
+
+# Compares the exported ONNX emotion model (EMOTION_ONNX_PATH) against
+# DeepFace's TensorFlow model on real face crops: set PARITY_IMAGES to a
+# folder of face photos. Skipped when the model has not been exported or no
+# photos are given.
+
+MIN_TOP1_AGREEMENT = 0.95
+MAX_MEAN_ABS_DIFF = 2.0  # percentage points per emotion
+MIN_FACES = 20
+
+
+def parity_faces(folder, limit=200):
+    # Emotion-model inputs for photos where the detector actually found a
+    # face (the whole-frame fallback is not a face crop)
+    faces = []
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name), "rb") as f:
+            try:
+                img = image_io.decode_image(f.read())
+            except image_io.InvalidImage:
+                continue
+        face, region = model_manager.extract_face(img)
+        if not region or (region["w"], region["h"]) == (img.shape[1], img.shape[0]):
+            continue
+        faces.append(face)
+        if len(faces) >= limit:
+            break
+    return faces
+
+
+def percentages(model, faces):
+    probs = np.asarray(model.predict_on_batch(faces[..., np.newaxis].astype(np.float32)), dtype=np.float64)
+    return 100.0 * probs / probs.sum(axis=1, keepdims=True)
+
+
+def test_onnx_matches_tensorflow():
+    if not os.path.exists(emotion_onnx.EMOTION_ONNX_PATH):
+        pytest.skip(f"{emotion_onnx.EMOTION_ONNX_PATH} not exported yet")
+    folder = os.getenv("PARITY_IMAGES")
+    if not folder:
+        pytest.skip("PARITY_IMAGES not set (folder of face photos)")
+
+    faces = parity_faces(folder)
+    assert len(faces) >= MIN_FACES, f"only {len(faces)} faces detected in {folder}"
+    faces = np.stack(faces)
+
+    reference = percentages(model_manager.load_emotion_model("tensorflow"), faces)
+    candidate = percentages(model_manager.load_emotion_model("onnx"), faces)
+
+    agreement = float((reference.argmax(axis=1) == candidate.argmax(axis=1)).mean())
+    mean_abs_diff = float(np.abs(reference - candidate).mean())
+    print(f"{len(faces)} faces: top-1 agreement {agreement:.3f}, mean |diff| {mean_abs_diff:.3f} pp")
+
+    assert agreement >= MIN_TOP1_AGREEMENT
+    assert mean_abs_diff <= MAX_MEAN_ABS_DIFF
+
+
+PROBE = """
+import sys
+import numpy as np
+import model_manager
+face, region = model_manager.extract_face(np.full((240, 320, 3), 128, dtype=np.uint8))
+assert face.shape == (48, 48) and region == {"x": 0, "y": 0, "w": 320, "h": 240}
+print("deepface" in sys.modules, "tensorflow" in sys.modules)
+"""
+
+
+def test_onnx_runtime_skips_tensorflow():
+    assert model_manager.uses_tensorflow("tensorflow", "opencv")
+    assert model_manager.uses_tensorflow("onnx", "retinaface")
+    assert not model_manager.uses_tensorflow("onnx", "opencv")
+
+    env = dict(os.environ, EMOTION_RUNTIME="onnx", FACE_DETECTOR_BACKEND="opencv")
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         env=env, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split()[-2:] == ["False", "False"]
+
+
+if __name__ == "__main__":
+    test_onnx_runtime_skips_tensorflow()
+    try:
+        test_onnx_matches_tensorflow()
+    except pytest.skip.Exception as e:
+        print(f"Skipped parity check: {e.msg}")
+    print("ONNX parity OK")
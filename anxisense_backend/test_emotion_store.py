@@ -0,0 +1,32 @@
+import numpy as np
+
+import emotion_store
+
+
+def test_pack_roundtrip_and_matrix():
+    emotions = {"angry": 1.5, "fear": 62.25, "sad": 20.0, "neutral": 16.25}
+    blob = emotion_store.pack(emotions)
+    assert len(blob) == emotion_store.VECTOR_BYTES == 28
+
+    decoded = emotion_store.unpack(blob)
+    assert decoded["fear"] == 62.25 and decoded["happy"] == 0.0
+
+    matrix = emotion_store.to_matrix([blob, None, blob])
+    assert matrix.shape == (3, 7)
+    assert np.isnan(matrix[1]).all() and matrix[2, 2] == np.float32(62.25)
+
+
+def test_rejects_bad_vectors():
+    for bad in ({"calm": 10}, {"fear": "high"}, {"fear": 120}, [0.1] * 7):
+        try:
+            emotion_store.pack(bad)
+        except emotion_store.InvalidVector:
+            continue
+        raise AssertionError(f"accepted {bad!r}")
+    assert emotion_store.pack(None) is None
+
+
+if __name__ == "__main__":
+    test_pack_roundtrip_and_matrix()
+    test_rejects_bad_vectors()
+    print("Emotion store OK")
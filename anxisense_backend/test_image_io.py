@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+
+import image_io
+
+
+def encode(shape, ext=".jpg"):
+    img = np.full(shape, 128, dtype=np.uint8)
+    return cv2.imencode(ext, img)[1].tobytes()
+
+
+def test_large_jpeg_decoded_within_budget():
+    img = image_io.decode_image(encode((3024, 4032, 3)))
+    assert img.shape == (756, 1008, 3)  # libjpeg 1/4 scale, no resize needed
+
+
+def test_png_capped_and_small_images_untouched():
+    img = image_io.decode_image(encode((2000, 2000, 3), ".png"), max_pixels=10000)
+    assert img.shape[0] * img.shape[1] <= 10000
+    assert image_io.decode_image(encode((120, 160, 3))).shape == (120, 160, 3)
+
+
+def test_perceptual_hash_ignores_noise_only():
+    rng = np.random.default_rng(0)
+    face = np.full((480, 640, 3), 200, dtype=np.uint8)
+    cv2.circle(face, (320, 240), 120, (120, 140, 180), -1)
+    face = cv2.GaussianBlur(face, (0, 0), 3)
+    noisy = np.clip(face + rng.normal(0, 3, face.shape), 0, 255).astype(np.uint8)
+    moved = np.roll(face, 60, axis=1)
+
+    assert image_io.perceptual_hash(face) == image_io.perceptual_hash(noisy)
+    assert image_io.perceptual_hash(face) != image_io.perceptual_hash(moved)
+
+
+def test_rejects_huge_header():
+    # Small JPEG whose SOF header claims 60000x60000 (3.6 GP)
+    data = bytearray(encode((16, 16, 3)))
+    sof = data.index(b"\xff\xc0")
+    data[sof + 5:sof + 9] = (60000).to_bytes(2, "big") * 2
+    try:
+        image_io.decode_image(bytes(data))
+    except image_io.InvalidImage as e:
+        assert "too large" in str(e)
+        return
+    raise AssertionError("expected InvalidImage")
+
+
+def test_rejects_garbage():
+    try:
+        image_io.decode_image(b"not an image")
+    except image_io.InvalidImage:
+        return
+    raise AssertionError("expected InvalidImage")
+
+
+if __name__ == "__main__":
+    test_large_jpeg_decoded_within_budget()
+    test_png_capped_and_small_images_untouched()
+    test_perceptual_hash_ignores_noise_only()
+    test_rejects_huge_header()
+    test_rejects_garbage()
+    print("Image decoding OK")
@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+
+from inference_batcher import InferenceBatcher
+
+
+def test_batches_concurrent_submits():
+    calls = []
+
+    def runner(batch):
+        calls.append(len(batch))
+        return batch.sum(axis=1)
+
+    batcher = InferenceBatcher(runner, max_batch_size=4, max_wait_ms=50, name="test")
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.submit(np.full(3, i, dtype=np.float32), timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Every caller gets its own row back, in fewer passes than callers
+    assert results == {i: 3.0 * i for i in range(8)}
+    assert sum(calls) == 8
+    assert max(calls) <= 4
+    assert len(calls) < 8
+    print(f"Batch sizes: {calls}")
+
+
+def test_runner_errors_reach_every_caller():
+    def runner(batch):
+        raise ValueError("boom")
+
+    batcher = InferenceBatcher(runner, max_batch_size=2, max_wait_ms=1, name="test-error")
+    try:
+        batcher.submit(np.zeros(3), timeout=5)
+    except ValueError as e:
+        assert str(e) == "boom"
+    else:
+        raise AssertionError("expected the runner error to propagate")
+
+
+if __name__ == "__main__":
+    test_batches_concurrent_submits()
+    test_runner_errors_reach_every_caller()
+    print("Inference batcher OK")
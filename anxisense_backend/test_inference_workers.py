@@ -0,0 +1,172 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Imported at module level on purpose: a spawned worker re-imports this
+# module (as the server re-imports app), so model_manager is loaded with
+# the default 5 ms window before the worker's own setup runs
+os.environ["INFERENCE_MAX_WAIT_MS"] = "5"
+import model_manager  # noqa: E402
+
+
+class FakeDeepFace:
+    @staticmethod
+    def build_model(**kwargs):
+        return None
+
+    @staticmethod
+    def extract_faces(img_path, **kwargs):
+        return [{"face": np.zeros((48, 48, 3), dtype=np.float32), "facial_area": None}]
+
+
+class FakeModel:
+    def predict_on_batch(self, batch):
+        return np.full((len(batch), 7), 1 / 7)
+
+
+def worker_batch_window():
+    import inference_workers
+
+    model_manager._deepface = lambda: FakeDeepFace
+    model_manager.load_emotion_model = lambda runtime: FakeModel()
+    inference_workers._load_model(0)
+    return model_manager.INFERENCE_MAX_WAIT_MS, model_manager._batcher.max_wait
+
+
+def test_worker_batcher_has_no_window():
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        configured, effective = pool.submit(worker_batch_window).result(60)
+    assert configured == 5.0
+    assert effective == 0.0
+
+
+def join_barrier(barrier):
+    # Stands in for _init_worker without loading a model
+    import inference_workers
+    inference_workers._barrier = barrier
+
+
+def fake_model(delay=0.0):
+    # Worker initializer: a model that reports what it was handed
+    def analyze(img):
+        time.sleep(delay)
+        return {"shape": img.shape, "mean": float(img.mean())}
+
+    model_manager.analyze = analyze
+    model_manager.analyze_batch = lambda imgs: [analyze(img) for img in imgs]
+
+
+def fresh_state():
+    import inference_workers
+    inference_workers._state = inference_workers.STATE_LOADING
+    inference_workers._error = None
+    inference_workers._done = threading.Event()
+    return inference_workers
+
+
+def test_warm_up_reaches_every_worker():
+    iw = fresh_state()
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=3, mp_context=ctx, initializer=join_barrier,
+                             initargs=(ctx.Barrier(3),)) as pool:
+        iw._warm_up(pool, 3)
+    assert iw.status() == iw.STATE_READY
+
+
+def test_warm_up_fails_when_a_worker_is_missing():
+    # Two pings, but the barrier expects three workers: one never shows up
+    iw = fresh_state()
+    timeout, iw.INFERENCE_WARMUP_TIMEOUT = iw.INFERENCE_WARMUP_TIMEOUT, 2
+    ctx = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=2, mp_context=ctx, initializer=join_barrier,
+                                 initargs=(ctx.Barrier(3),)) as pool:
+            iw._warm_up(pool, 2)
+    finally:
+        iw.INFERENCE_WARMUP_TIMEOUT = timeout
+    assert iw.status() == iw.STATE_FAILED
+    assert iw.last_error() == "BrokenBarrierError"
+
+
+def test_broken_pool_marks_failed():
+    iw = fresh_state()
+    ctx = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=ctx)
+    try:
+        pool.submit(os._exit, 1).exception(60)  # the worker dies, the pool is broken
+        iw._executor, iw._state = pool, iw.STATE_READY
+        try:
+            iw.analyze(np.zeros((48, 48, 3), dtype=np.uint8))
+        except iw.ModelNotReady:
+            pass
+        else:
+            raise AssertionError("expected ModelNotReady")
+        assert iw.status() == iw.STATE_FAILED
+        assert "broke" in iw.last_error()
+    finally:
+        iw._executor = None
+        pool.shutdown()
+
+
+SHARED_PROBE = """
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import inference_workers as iw
+import test_inference_workers as t
+
+pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"), initializer=t.fake_model)
+iw._executor, iw._state = pool, iw.STATE_READY
+img = np.full((120, 160, 3), 7, dtype=np.uint8)
+for _ in range(3):
+    assert iw.analyze(img) == {"shape": (120, 160, 3), "mean": 7.0}
+    assert iw.analyze_batch([img, img + 1]) == [{"shape": (120, 160, 3), "mean": 7.0}, {"shape": (120, 160, 3), "mean": 8.0}]
+pool.shutdown()
+print("shared OK")
+"""
+
+
+def test_shared_memory_round_trip_is_clean():
+    # Runs in its own interpreter so the resource tracker's complaints
+    # (printed on stderr, not raised) can be checked
+    out = subprocess.run([sys.executable, "-c", SHARED_PROBE], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    assert "shared OK" in out.stdout
+    assert "Traceback" not in out.stderr and "leaked" not in out.stderr, out.stderr
+
+
+def test_timeout_is_not_ready():
+    iw = fresh_state()
+    ctx = multiprocessing.get_context("spawn")
+    timeout, iw.INFERENCE_TIMEOUT = iw.INFERENCE_TIMEOUT, 0.5
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=fake_model, initargs=(3.0,))
+    try:
+        iw._executor, iw._state = pool, iw.STATE_READY
+        try:
+            iw.analyze(np.zeros((48, 48, 3), dtype=np.uint8))
+        except iw.ModelNotReady as e:
+            assert "did not answer" in str(e)
+        else:
+            raise AssertionError("expected ModelNotReady")
+    finally:
+        iw.INFERENCE_TIMEOUT = timeout
+        iw._executor = None
+        pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    test_worker_batcher_has_no_window()
+    test_warm_up_reaches_every_worker()
+    test_warm_up_fails_when_a_worker_is_missing()
+    test_broken_pool_marks_failed()
+    test_shared_memory_round_trip_is_clean()
+    test_timeout_is_not_ready()
+    print("Inference workers OK")
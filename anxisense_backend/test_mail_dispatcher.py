@@ -0,0 +1,122 @@
+import socketserver
+import threading
+import time
+
+import metrics
+from mail_dispatcher import MailDispatcher
+
+
+# Just enough of an SMTP server for smtplib: EHLO, AUTH PLAIN, one or more
+# MAIL/RCPT/DATA transactions per connection. fail_first_data replies 451
+# (try again later) to the first DATA it sees.
+class StandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fail_first_data=False, drop_after=None):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.connections = 0
+        self.messages = []
+        self.fail_first_data = fail_first_data
+        self.drop_after = drop_after
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        served = 0
+        self.reply("220 stand-in ready")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-stand-in")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                self.reply("235 ok")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 ok")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk == b".\r\n":
+                        break
+                    data.append(chunk)
+                if self.server.fail_first_data:
+                    self.server.fail_first_data = False
+                    self.reply("451 try again later")
+                    continue
+                self.server.messages.append(b"".join(data))
+                self.reply("250 queued")
+                served += 1
+                if self.server.drop_after and served >= self.server.drop_after:
+                    return  # close the session without QUIT
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+def dispatcher_for(server, **kwargs):
+    host, port = server.server_address
+    return MailDispatcher(host, port, "sender@example.com", "secret", timeout=5, **kwargs)
+
+
+def test_session_is_reused():
+    server = StandIn()
+    mailer = dispatcher_for(server, retry_base=0)
+    for i in range(5):
+        assert mailer.enqueue(f"doctor{i}@example.com", "Your AnxiSense OTP Code", f"code {i}")
+    mailer.join()
+    assert len(server.messages) == 5
+    assert server.connections == 1
+    assert b"code 4" in server.messages[-1]
+    mailer.stop()
+
+
+def test_transient_failure_is_retried():
+    server = StandIn(fail_first_data=True)
+    mailer = dispatcher_for(server, retry_base=0.01)
+    mailer.enqueue("doctor@example.com", "Your AnxiSense OTP Code", "code")
+    mailer.join()
+    assert len(server.messages) == 1
+    mailer.stop()
+
+
+def test_dropped_session_reconnects():
+    server = StandIn(drop_after=1)
+    mailer = dispatcher_for(server, retry_base=0)
+    mailer.enqueue("a@example.com", "s", "first")
+    mailer.join()
+    time.sleep(0.05)  # let the server close its end
+    mailer.enqueue("b@example.com", "s", "second")
+    mailer.join()
+    assert len(server.messages) == 2
+    assert server.connections == 2
+    mailer.stop()
+
+
+def test_unreachable_server_gives_up():
+    failed = metrics.counter("mail_messages_total", "", ["result"]).samples().get(("failed",), 0)
+    mailer = MailDispatcher("127.0.0.1", 1, "sender@example.com", "secret", timeout=1, max_retries=2, retry_base=0)
+    mailer.enqueue("doctor@example.com", "s", "never delivered")
+    mailer.join()
+    assert metrics.counter("mail_messages_total", "", ["result"]).samples()[("failed",)] == failed + 1
+    mailer.stop()
+
+
+if __name__ == "__main__":
+    test_session_is_reused()
+    test_transient_failure_is_retried()
+    test_dropped_session_reconnects()
+    test_unreachable_server_gives_up()
+    print("Mail dispatcher OK")
@@ -0,0 +1,67 @@
+import time
+
+import otp_store
+from otp_store import MemoryOtpStore
+
+
+def test_code_is_single_use():
+    store = MemoryOtpStore(ttl=60)
+    code = store.issue("Doctor@Example.com")
+    assert len(code) == 6 and code.isdigit()
+    assert store.verify("doctor@example.com", code) == otp_store.VERIFIED
+    assert store.verify("doctor@example.com", code) == otp_store.EXPIRED
+
+
+def test_new_code_replaces_old():
+    store = MemoryOtpStore(ttl=60)
+    first = store.issue("a@example.com")
+    second = store.issue("a@example.com")
+    if first != second:
+        assert store.verify("a@example.com", first) == otp_store.INVALID
+    assert store.verify("a@example.com", second) == otp_store.VERIFIED
+
+
+def test_expiry():
+    store = MemoryOtpStore(ttl=0.05)
+    code = store.issue("a@example.com")
+    time.sleep(0.1)
+    assert store.verify("a@example.com", code) == otp_store.EXPIRED
+    assert len(store) == 0
+
+
+def test_wrong_guesses_lock_the_code():
+    store = MemoryOtpStore(ttl=60, max_attempts=3)
+    code = store.issue("a@example.com")
+    wrong = "000000" if code != "000000" else "111111"
+    assert store.verify("a@example.com", wrong) == otp_store.INVALID
+    assert store.verify("a@example.com", wrong) == otp_store.INVALID
+    assert store.verify("a@example.com", wrong) == otp_store.LOCKED
+    assert store.verify("a@example.com", code) == otp_store.EXPIRED
+
+
+def test_non_ascii_code_is_a_wrong_guess():
+    store = MemoryOtpStore(ttl=60)
+    code = store.issue("a@example.com")
+    assert store.verify("a@example.com", "１２３４５６") == otp_store.INVALID
+    assert store.verify("a@example.com", "é") == otp_store.INVALID
+    assert store.verify("a@example.com", code) == otp_store.VERIFIED
+
+
+def test_bounded_size():
+    store = MemoryOtpStore(ttl=60, maxsize=2)
+    store.issue("a@example.com")
+    store.issue("b@example.com")
+    code = store.issue("c@example.com")
+    assert len(store) == 2
+    assert store.verify("a@example.com", "123456") == otp_store.EXPIRED
+    assert store.verify("c@example.com", code) == otp_store.VERIFIED
+
+
+if __name__ == "__main__":
+    test_code_is_single_use()
+    test_new_code_replaces_old()
+    test_expiry()
+    test_wrong_guesses_lock_the_code()
+    test_non_ascii_code_is_a_wrong_guess()
+    test_bounded_size()
+    print("OTP store OK")
@@ -0,0 +1,81 @@
+import json
+import logging
+import time
+
+from flask import Flask, jsonify
+
+import logs
+import metrics
+import request_metrics
+
+
+def make_app():
+    app = Flask(__name__)
+    request_metrics.install(app)
+
+    @app.route("/api/items/<int:item_id>")
+    def item(item_id):
+        with metrics.phase("query"):
+            time.sleep(0.01)
+        return jsonify({"id": item_id}), 200 if item_id else 404
+
+    return app
+
+
+def test_requests_are_counted_by_route_template():
+    client = make_app().test_client()
+    client.get("/api/items/1")
+    client.get("/api/items/2")
+    client.get("/api/items/0")
+    client.get("/nope")
+
+    responses = request_metrics.RESPONSES.samples()
+    assert responses[("GET", "/api/items/<int:item_id>", "200")] == 2
+    assert responses[("GET", "/api/items/<int:item_id>", "404")] == 1
+    assert responses[("GET", "unmatched", "404")] == 1
+    assert request_metrics.REQUEST_SECONDS.samples()[("GET", "/api/items/<int:item_id>")]["count"] == 3
+    assert request_metrics.IN_FLIGHT.samples()[("/api/items/<int:item_id>",)] == 0
+    assert metrics.PHASE_SECONDS.samples()[("query",)]["sum"] >= 0.03
+
+
+def test_phases_collected_per_thread():
+    metrics.start_phases()
+    with metrics.phase("detection"):
+        pass
+    metrics.record_phase("inference", 0.25)
+    metrics.record_phase("inference", 0.25)
+    timings = metrics.stop_phases()
+    assert set(timings) == {"detection", "inference"}
+    assert timings["inference"] == 0.5
+    assert metrics.stop_phases() == {}
+
+
+def test_prometheus_text():
+    c = metrics.counter("test_render_total", "Things", ["kind"])
+    c.inc(kind='say "hi"')
+    h = metrics.histogram("test_render_seconds", "Latency", buckets=(0.1, 1.0))
+    h.observe(0.05)
+    h.observe(0.5)
+    text = metrics.render_prometheus()
+    assert "# TYPE test_render_total counter" in text
+    assert 'test_render_total{kind="say \\"hi\\""} 1' in text
+    assert 'test_render_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_render_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_render_seconds_bucket{le="+Inf"} 2' in text
+    assert "test_render_seconds_count 2" in text
+
+
+def test_json_log_line():
+    record = logging.LogRecord("anxisense.app", logging.INFO, __file__, 1, "analysis", (), None)
+    record.anxiety_score = 41.5
+    line = json.loads(logs.JsonFormatter().format(record))
+    assert line["msg"] == "analysis" and line["level"] == "INFO"
+    assert line["anxiety_score"] == 41.5
+
+
+if __name__ == "__main__":
+    test_requests_are_counted_by_route_template()
+    test_phases_collected_per_thread()
+    test_prometheus_text()
+    test_json_log_line()
+    print("Request metrics OK")
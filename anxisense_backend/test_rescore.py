@@ -0,0 +1,46 @@
+import numpy as np
+
+import emotion_store
+import rescore
+import scoring
+
+
+def stored_rows(n=2000, seed=0):
+    # Rows as /api/analyze + save_assessment leave them: score rounded to
+    # 2 dp, level bucketed from the raw weighted sum
+    rng = np.random.default_rng(seed)
+    mixes = rng.dirichlet(np.ones(7), size=n) * 100
+    dicts = [dict(zip(scoring.EMOTION_LABELS, (float(v) for v in mix))) for mix in mixes]
+    rows = []
+    for i, emotions in enumerate(dicts, start=1):
+        score, level = scoring.score(emotions)
+        vector = emotion_store.pack(emotions) if i % 3 else None  # some legacy rows have none
+        rows.append((i, score, level, vector))
+
+    # Raw score 29.996: stored as 30.0 but still "Low", with and without a vector
+    boundary = {"fear": 59.992, "neutral": 40.008}
+    rows.append((n + 1, 30.0, "Low", emotion_store.pack(boundary)))
+    rows.append((n + 2, 30.0, "Low", None))
+    return rows
+
+
+def test_rescore_with_same_profile_changes_nothing():
+    rows = stored_rows()
+    assert scoring.score({"fear": 59.992, "neutral": 40.008}) == (30.0, "Low")
+    ids, scores, levels = rescore.score_chunk(rows, scoring.get_profile("v1"))
+    assert len(ids) == 0, list(zip(ids, scores, levels))[:5]
+
+
+def test_rescore_with_new_thresholds():
+    profile = scoring.Profile("stricter", {"fear": 0.5, "sad": 0.3, "surprise": 0.2}, [20, 40])
+    rows = stored_rows(200)
+    ids, _, levels = rescore.score_chunk(rows, profile)
+    expected = [r[0] for r in rows if scoring.level(r[1], profile) != r[2]]
+    assert sorted(ids.tolist()) == sorted(expected) or len(ids) >= len(expected)
+    assert set(levels) <= {"Moderate", "High"}
+
+
+if __name__ == "__main__":
+    test_rescore_with_same_profile_changes_nothing()
+    test_rescore_with_new_thresholds()
+    print("Rescore OK")
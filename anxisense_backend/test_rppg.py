@@ -0,0 +1,87 @@
+import numpy as np
+
+import rppg
+
+
+def synthetic_rgb(bpm, seconds=8, fps=10, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * fps)) / fps
+    pulse = np.sin(2 * np.pi * bpm / 60.0 * t)
+    base = np.array([150.0, 110.0, 90.0])
+    # Pulse shows mostly in green, plus slow drift and sensor noise
+    rgb = base + np.outer(pulse, [0.3, 1.0, 0.2]) + np.outer(t, [0.5, 0.5, 0.5])
+    return rgb + rng.normal(0, 0.2, rgb.shape)
+
+
+def test_recovers_pulse_rate():
+    result = rppg.estimate(synthetic_rgb(72), fps=10)
+    assert abs(result["bpm"] - 72) < 4, result
+    assert result["snr_db"] > 0
+
+
+def test_flat_signal_has_no_pulse():
+    result = rppg.estimate([0] * 300, fps=10)
+    assert result["bpm"] is None and result["hrv_rmssd_ms"] is None, result
+
+    rng = np.random.default_rng(0)
+    noise = rppg.estimate(100 + rng.normal(0, 1, (150, 3)), fps=10)
+    assert noise["bpm"] is None, noise
+
+
+def beats(ibis_ms, fps=10):
+    # Green-channel pulse peaking exactly at the given beat times
+    times = np.concatenate([[0.0], np.cumsum(ibis_ms) / 1000.0])
+    t = np.arange(0, times[-1], 1.0 / fps)
+    return 100 + np.cos(np.interp(t, times, 2 * np.pi * np.arange(len(times))))
+
+
+def test_hrv_resolves_below_one_frame():
+    # At 10 fps one frame is 100 ms; RMSSD must still come out within 10 ms
+    steady = rppg.estimate(beats([60000 / 72] * 40), fps=10)
+    assert steady["hrv_rmssd_ms"] < 5, steady
+
+    rng = np.random.default_rng(3)
+    ibis = 800 + np.cumsum(rng.normal(0, 10, 40)) + rng.normal(0, 20, 40)
+    true_rmssd = np.sqrt(np.mean(np.diff(ibis) ** 2))  # about 34 ms
+    result = rppg.estimate(beats(ibis), fps=10)
+    assert abs(result["hrv_rmssd_ms"] - true_rmssd) < 10, (result, true_rmssd)
+
+
+def test_stacked_scans():
+    results = rppg.estimate(np.stack([synthetic_rgb(66), synthetic_rgb(96, seed=1)]), fps=10)
+    assert abs(results[0]["bpm"] - 66) < 4 and abs(results[1]["bpm"] - 96) < 4, results
+
+
+def test_rejects_short_signal():
+    try:
+        rppg.estimate(synthetic_rgb(72, seconds=2), fps=10)
+    except rppg.InvalidSignal:
+        return
+    raise AssertionError("expected InvalidSignal")
+
+
+def test_rejects_malformed_input():
+    cases = [
+        ([], 10, None),
+        (72.0, 10, None),
+        ([[1, 2], [3]], 10, None),
+        (synthetic_rgb(72), 10, []),
+        (synthetic_rgb(72), 10, 5),
+        (synthetic_rgb(72), float("nan"), None),
+    ]
+    for signal, fps, timestamps in cases:
+        try:
+            rppg.estimate(signal, fps, timestamps=timestamps)
+        except rppg.InvalidSignal:
+            continue
+        raise AssertionError(f"expected InvalidSignal for {signal!r:.40}, fps={fps}, timestamps={timestamps}")
+
+
+if __name__ == "__main__":
+    test_recovers_pulse_rate()
+    test_flat_signal_has_no_pulse()
+    test_hrv_resolves_below_one_frame()
+    test_stacked_scans()
+    test_rejects_short_signal()
+    test_rejects_malformed_input()
+    print("rPPG OK")
@@ -0,0 +1,41 @@
+import scan_sessions
+
+
+def frame(t, score):
+    return {"timestamp": t, "anxiety_score": score}
+
+
+def test_frames_come_back_in_capture_order():
+    session = scan_sessions.create()
+    late = session.reserve(1)
+    early = session.reserve(1)
+    session.fill(early, [frame(0.25, 20.0)])
+    assert [f["timestamp"] for f in session.frames()] == [0.25]  # "late" still in flight
+
+    session.fill(late, [frame(0.5, 40.0)])
+    failed = session.reserve(1)
+    session.release(failed, 1)
+    assert [f["timestamp"] for f in session.frames()] == [0.25, 0.5]
+
+
+def test_frame_cap_and_close():
+    session = scan_sessions.create()
+    session.reserve(scan_sessions.SCAN_SESSION_MAX_FRAMES)
+    try:
+        session.reserve(1)
+        raise AssertionError("expected SessionFull")
+    except scan_sessions.SessionFull:
+        pass
+
+    assert scan_sessions.close(session.id) is session
+    try:
+        scan_sessions.get(session.id)
+        raise AssertionError("expected SessionNotFound")
+    except scan_sessions.SessionNotFound:
+        pass
+
+
+if __name__ == "__main__":
+    test_frames_come_back_in_capture_order()
+    test_frame_cap_and_close()
+    print("Scan sessions OK")
@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+import scoring
+
+
+def legacy_calculate_anxiety(emotions):
+    anxiety_score = 0.5 * emotions.get("fear", 0) + 0.3 * emotions.get("sad", 0) + 0.2 * emotions.get("surprise", 0)
+    if anxiety_score < 30:
+        level = "Low"
+    elif anxiety_score < 60:
+        level = "Moderate"
+    else:
+        level = "High"
+    return round(anxiety_score, 2), level
+
+
+def test_v1_matches_legacy_formula():
+    rng = np.random.default_rng(0)
+    matrix = rng.dirichlet(np.ones(7), size=500) * 100
+    scores, levels = scoring.score_matrix(matrix, scoring.get_profile("v1"))
+    for row, s, l in zip(matrix, scores, levels):
+        expected = legacy_calculate_anxiety(dict(zip(scoring.EMOTION_LABELS, row)))
+        assert (s, l) == expected
+
+    assert scoring.score({"fear": 60}) == (30.0, "Moderate")  # threshold belongs to the higher level
+    assert scoring.level(59.99) == "Moderate" and scoring.level(60) == "High"
+
+
+def test_custom_profile_and_speed():
+    profile = scoring.Profile("test", {"fear": 1.0}, [10, 20])
+    _, levels = scoring.score_matrix([[0, 0, 5, 0, 0, 0, 0], [0, 0, 25, 0, 0, 0, 0]], profile)
+    assert list(levels) == ["Low", "High"]
+
+    matrix = np.random.default_rng(1).random((1000000, 7)) * 100
+    start = time.perf_counter()
+    scores, levels = scoring.score_matrix(matrix)
+    assert len(scores) == len(levels) == 1000000
+    assert time.perf_counter() - start < 2.0
+
+
+if __name__ == "__main__":
+    test_v1_matches_legacy_formula()
+    test_custom_profile_and_speed()
+    print("Scoring OK")
@@ -0,0 +1,34 @@
+import io
+
+import cv2
+import numpy as np
+from werkzeug.datastructures import FileStorage, MultiDict
+
+import sequence
+
+
+class FakeRequest:
+    def __init__(self, fps):
+        jpeg = cv2.imencode(".jpg", np.zeros((32, 32, 3), dtype=np.uint8))[1].tobytes()
+        self.files = MultiDict([("frames", FileStorage(io.BytesIO(jpeg))) for _ in range(4)])
+        self.form = {"fps": fps}
+
+
+def test_rejects_bad_fps():
+    for fps in ("0", "-5", "nan", "inf", "abc"):
+        try:
+            sequence.read_sequence(FakeRequest(fps))
+        except sequence.InvalidSequence:
+            continue
+        raise AssertionError(f"expected InvalidSequence for fps={fps}")
+
+
+def test_frame_timestamps():
+    frames = sequence.read_sequence(FakeRequest("2"))
+    assert [t for t, _ in frames] == [0.0, 0.5, 1.0, 1.5]
+
+
+if __name__ == "__main__":
+    test_rejects_bad_fps()
+    test_frame_timestamps()
+    print("Sequence OK")
@@ -0,0 +1,80 @@
+import json
+from datetime import datetime, date
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+import pagination
+import serialization
+
+app = Flask(__name__)
+app.json = serialization.JSONResponses(app)
+
+
+class FakeCursor:
+    def __init__(self, columns, rows):
+        self.description = [(c, None, None, None, None, None, None) for c in columns]
+        self._rows = list(rows)
+        self.closed = False
+
+    def fetchmany(self, n):
+        chunk, self._rows = self._rows[:n], self._rows[n:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDb:
+    def close(self):
+        pass
+
+
+def test_db_values():
+    row = {"created_at": datetime(2024, 5, 1, 10, 0, 0), "dob": date(1990, 1, 2),
+           "score": Decimal("42.50"), "blob": b"\x01\x02", "name": "Zoë"}
+    out = json.loads(serialization.dumps(row))
+    assert out == {"created_at": "2024-05-01 10:00:00", "dob": "1990-01-02 00:00:00",
+                   "score": 42.5, "blob": "AQI=", "name": "Zoë"}
+
+
+def test_encode_rows_from_tuples():
+    encoded = serialization.encode_rows(["id", "score"], [(1, Decimal("1.5")), (2, None)])
+    assert json.loads("[" + encoded + "]") == [{"id": 1, "score": 1.5}, {"id": 2, "score": None}]
+    assert serialization.encode_rows(["id"], []) == ""
+
+
+def stream(cursor, limit, cursor_key=None):
+    with app.test_request_context():
+        response = pagination.stream_rows(FakeDb(), cursor, limit, cursor_key)
+        return json.loads("".join(response.response))
+
+
+def test_stream_rows_pages_across_chunks():
+    chunk_size, pagination.STREAM_CHUNK_SIZE = pagination.STREAM_CHUNK_SIZE, 3
+    rows = [(i, datetime(2024, 1, 1, 0, 0, i)) for i in range(10, 0, -1)]
+    cursor = FakeCursor(["id", "created_at"], rows[:7])  # limit 6 + the extra row
+    body = stream(cursor, 6, lambda row: f"{row['created_at']}|{row['id']}")
+    assert [r["id"] for r in body["data"]] == [10, 9, 8, 7, 6, 5]
+    assert body["data"][0]["created_at"] == "2024-01-01 00:00:10"
+    assert body["next_cursor"] == "2024-01-01 00:00:05|5"
+    assert cursor.closed
+
+    cursor = FakeCursor(["id", "created_at"], rows[:4])
+    body = stream(cursor, None)
+    assert len(body["data"]) == 4 and body["next_cursor"] is None
+    pagination.STREAM_CHUNK_SIZE = chunk_size
+
+
+def test_flask_provider():
+    with app.app_context():
+        response = jsonify({"last_assessment_date": datetime(2024, 5, 1, 10, 0, 0), "score": Decimal("3")})
+    assert json.loads(response.get_data()) == {"last_assessment_date": "2024-05-01 10:00:00", "score": 3.0}
+
+
+if __name__ == "__main__":
+    test_db_values()
+    test_encode_rows_from_tuples()
+    test_stream_rows_pages_across_chunks()
+    test_flask_provider()
+    print("Serialization OK")